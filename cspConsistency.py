@@ -7,53 +7,235 @@
 # This work is licensed under a Creative Commons
 # Attribution-NonCommercial-ShareAlike 4.0 International License.
 # See: http://creativecommons.org/licenses/by-nc-sa/4.0/deed.en
+import heapq
+import random
 from searchProblem import Arc, Search_problem
 from display import Displayable
+from slotDomain import Slot_domain, iter_bits, support_tables
+from cspTemporal import Temporal_network
+from intervalDomain import Interval_domain
+from domainMap import Domain_map
 
 class Con_solver(Displayable):
     """Solves a CSP with arc consistency and domain splitting
     """
-    def __init__(self, csp, **kwargs):
+    def __init__(self, csp, var_order='first', seed=None, **kwargs):
         """a CSP solver that uses arc consistency
         * csp is the CSP to be solved
+        * var_order is how the variable to split is chosen, one of var_orders
+        * seed is the seed of the random choices
         * kwargs is the keyword arguments for Displayable superclass
         """
+        if var_order not in var_orders:
+            raise ValueError(f"unknown var_order {var_order!r}, expected one of {sorted(var_orders)}")
         self.csp = csp
+        self.supports = {}   # (var, const):(support table, residues) for bitset domains
+        self.var_order = var_orders[var_order]
+        self.random = random.Random(seed)
+        self.weights = {}    # const:weight, one more than the domains const wiped out
+        self.index_constraints()
         super().__init__(**kwargs)    # Or Displayable.__init__(self,**kwargs)
+
+    def index_constraints(self):
+        """(re)builds what propagation precomputes from the constraints of the CSP:
+        * temporal, the Temporal_network of its difference constraints
+        * global_constraints, the constraints whose condition has a propagate method
+        * globals_of, a var:list of the global constraints on var dictionary
+        * revisit, the arcs_from() lists, built again on demand
+        * counts, the Split_counts of the variable orders, counted again on demand
+        It must be called again whenever constraints are added or removed.
+        """
+        csp = self.csp
+        self.revisit = {}
+        self.counts = Split_counts(self)
+        self.temporal = Temporal_network(csp)
+        self.global_constraints = {const for const in csp.constraints
+                                   if hasattr(const.condition, 'propagate')}
+        self.globals_of = {}
+        for const in self.global_constraints:
+            for var in const.scope:
+                self.globals_of.setdefault(var, []).append(const)
         
+    def forget_constraint(self, const):
+        """drops what was learned about const (its support tables and its
+        weight), once it has been removed from the CSP"""
+        for var in const.scope:
+            self.supports.pop((var, const), None)
+        self.weights.pop(const, None)
+
     def make_arc_consistent(self, orig_domains=None, to_do=None):
         """Makes this CSP arc-consistent using generalized arc consistency
         orig_domains is the original domains
         to_do is a set of (variable,constraint) pairs
         returns the reduced domains (an arc-consistent variable:domain dictionary)
+        If a domain becomes empty, propagation stops and that domain is empty
+        in the returned dictionary.
         """
         if orig_domains is None:
             orig_domains = self.csp.domains
         if to_do is None:
-            to_do = {(var, const) for const in self.csp.constraints
-                     for var in const.scope}
-        else:
-            to_do = to_do.copy()  # use a copy of to_do
-        domains = orig_domains.copy()
-        self.display(2,"Performing AC with domains", domains)
-        while to_do:
-            var, const = self.select_arc(to_do)
-            self.display(3, "Processing arc (", var, ",", const, ")")
-            other_vars = [ov for ov in const.scope if ov != var]
-            new_domain = {val for val in domains[var]
-                            if self.any_holds(domains, const, {var: val}, other_vars)}
-            if new_domain != domains[var]:
-                self.display(4, "Arc: (", var, ",", const, ") is inconsistent")
-                self.display(3, "Domain pruned", "dom(", var, ") =", new_domain,
-                                 " due to ", const)
-                domains[var] = new_domain
-                add_to_do = self.new_to_do(var, const) - to_do
-                to_do |= add_to_do      # set union
-                self.display(3, "  adding", add_to_do if add_to_do else "nothing", "to to_do.")
-            self.display(4, "Arc: (", var, ",", const, ") now consistent")
+            to_do = self.all_arcs()
+        domains = Domain_store(orig_domains)
+        self.display(2,"Performing AC with domains", orig_domains)
+        self.propagate(domains, to_do)
+        domains = domains.snapshot()
         self.display(2, "AC done. Reduced domains", domains)
         return domains
 
+    def all_arcs(self):
+        """returns the set of all (variable,constraint) pairs of the CSP"""
+        return {(var, const) for const in self.csp.constraints
+                for var in const.scope}
+
+    def propagate(self, domains, to_do):
+        """Makes the domains arc-consistent, in place.
+        domains is a Domain_store; every pruned domain is recorded on its trail
+        to_do is a collection of (variable,constraint) pairs; they are revised
+        from an Arc_queue, so to_do itself is not changed
+        The constraints of the temporal network are propagated on the bounds of
+        the tasks in their scopes instead, and global constraints (those whose
+        condition has a propagate method) as a whole, whenever one of the
+        tasks in their scopes changes.
+        returns False as soon as a domain becomes empty, or at once if one already
+        is (e.g. node consistency emptied it), otherwise True
+        The trace of every arc is only built when max_display_level is 3 or more.
+        """
+        if any(len(domains[var]) == 0 for var in domains):
+            self.display(2, "A domain is empty:", domains)
+            return False
+        trace = self.max_display_level >= 3
+        temporal = self.temporal
+        moved = set()      # tasks of the temporal network whose bounds are to be propagated
+        waiting = set()    # global constraints to be propagated
+        queue = Arc_queue(domains)
+        for arc in to_do:
+            const = arc[1]
+            if const in temporal.scopes:
+                moved.update(temporal.scopes[const])
+            if const in self.global_constraints:
+                waiting.add(const)
+            elif const not in temporal.exact:
+                queue.add(arc)
+        to_do = queue
+        while to_do or moved or waiting:
+            if moved:
+                changed = temporal.propagate(domains, moved)
+                if changed is None:
+                    if trace:
+                        self.display(3, "  the temporal network has no solution")
+                    return False
+                if trace:
+                    self.display(3, "  start bounds cut", changed if changed else "nothing")
+                moved = set()
+                for var in changed:
+                    self.wake(var, temporal, to_do, moved, waiting)
+                continue
+            if not to_do:
+                const = waiting.pop()
+                changed = const.condition.propagate(domains, const.scope)
+                if changed is None:
+                    if trace:
+                        self.display(3, "  ", const, "has no solution")
+                    self.add_weight(const)
+                    return False
+                if trace:
+                    self.display(3, "  ", const, "cut", changed if changed else "nothing")
+                for var in changed:
+                    self.wake(var, None, to_do, moved, waiting)
+                continue
+            var, const = self.select_arc(to_do)
+            if trace:
+                self.display(3, "Processing arc (", var, ",", const, ")")
+            new_domain = self.revise(domains, var, const)
+            if new_domain != domains[var]:
+                if trace:
+                    self.display(4, "Arc: (", var, ",", const, ") is inconsistent")
+                    self.display(3, "Domain pruned", "dom(", var, ") =", new_domain,
+                                     " due to ", const)
+                domains.assign(var, new_domain)
+                if len(new_domain) == 0:
+                    if trace:
+                        self.display(3, "  dom(", var, ") is empty")
+                    self.add_weight(const)
+                    return False
+                add_to_do = self.wake(var, const, to_do, moved, waiting)
+                if trace:
+                    self.display(3, "  adding", add_to_do if add_to_do else "nothing", "to to_do.")
+            if trace:
+                self.display(4, "Arc: (", var, ",", const, ") now consistent")
+        return True
+
+    def wake(self, var, source, to_do, moved, waiting):
+        """schedules what must be propagated after the domain of var changed
+        because of source (a constraint, the temporal network or None): the arcs
+        of var, its bounds in the temporal network and its global constraints.
+        returns the list of the arcs added to to_do
+        """
+        if source is not self.temporal and (var in self.temporal.upper or var in self.temporal.lower):
+            moved.add(var)
+        waiting.update(self.globals_of.get(var, ()))
+        return [arc for arc in self.arcs_from(var)
+                if arc[1] is not source and to_do.add(arc)]
+
+    def revise(self, domains, var, const):
+        """returns the values in the domain of var that are supported in const.
+        Binary constraints between two bitset domains use compiled support tables
+        and residual supports. A binary constraint whose condition has a
+        supported attribute, a function (position, dom, other) returning the
+        values of dom, the domain of scope[position], that have a support in
+        other, the domain of the other variable, is revised by it on whole
+        intervals of an Interval_domain. Other constraints enumerate the other
+        domains.
+        """
+        if len(const.scope) == 2:
+            if all(isinstance(domains[v], Slot_domain) for v in const.scope):
+                return self.revise_with_supports(domains, var, const)
+            supported = getattr(const.condition, 'supported', None)
+            if supported is not None:
+                x, y = const.scope
+                if var == x:
+                    return supported(0, domains[x], domains[y])
+                return supported(1, domains[y], domains[x])
+        other_vars = [ov for ov in const.scope if ov != var]
+        return filter_domain(domains[var],
+                    lambda val: self.any_holds(domains, const, {var: val}, other_vars))
+
+    def revise_with_supports(self, domains, var, const):
+        """revises the bitset domain of var against binary constraint const.
+        Value i of var keeps its residue, the last support found for it, while
+        the residue is still in the other domain; only then is the support
+        table consulted for a new support.
+        """
+        if (var, const) not in self.supports:
+            self.compile_supports(domains, const)
+        table, residues = self.supports[(var, const)]
+        other = domains[const.scope[1] if const.scope[0] == var else const.scope[0]].bits
+        dom = domains[var]
+        bits = dom.bits
+        for i in iter_bits(bits):
+            if (other >> residues[i]) & 1:
+                continue
+            support = table[i] & other
+            if support:
+                residues[i] = (support & -support).bit_length() - 1
+            else:
+                bits ^= 1 << i
+        return dom if bits == dom.bits else dom.with_bits(bits)
+
+    def compile_supports(self, domains, const):
+        """compiles the support tables of binary constraint const for both of its
+        variables, with every residue initially the first support of its value.
+        A value without any support gets a residue past the end of the other
+        space, which is never in the other domain.
+        """
+        x, y = const.scope
+        x_space, y_space = domains[x].space, domains[y].space
+        x_table, y_table = support_tables(const.condition, x_space, y_space)
+        for var, table, other_space in ((x, x_table, y_space), (y, y_table, x_space)):
+            none = len(other_space.values)
+            residues = [(sup & -sup).bit_length() - 1 if sup else none for sup in table]
+            self.supports[(var, const)] = (table, residues)
+
     def new_to_do(self, var, const):
         """returns new elements to be added to to_do after assigning
         variable var in constraint const.
@@ -63,12 +245,27 @@ class Con_solver(Displayable):
                 for nvar in nconst.scope
                 if nvar != var}
 
+    def arcs_from(self, var):
+        """returns the list of (variable,constraint) pairs to revise when the
+        domain of var changes: the other variables of the constraints on var,
+        but for the constraints the temporal network enforces and the global
+        constraints, which are propagated as a whole.
+        It is computed once per variable.
+        """
+        if var not in self.revisit:
+            self.revisit[var] = [(nvar, nconst) for nconst in self.csp.var_to_const[var]
+                                 if nconst not in self.temporal.exact
+                                 and nconst not in self.global_constraints
+                                 for nvar in nconst.scope
+                                 if nvar != var]
+        return self.revisit[var]
+
     def select_arc(self, to_do):
         """Selects the arc to be taken from to_do .
-        * to_do is a set of arcs, where an arc is a (variable,constraint) pair
+        * to_do is an Arc_queue of arcs, where an arc is a (variable,constraint) pair
         the element selected must be removed from to_do.
         """
-        return to_do.pop() 
+        return to_do.pop()
 
     def any_holds(self, domains, const, env, other_vars, ind=0):
         """returns True if Constraint const holds for an assignment
@@ -93,40 +290,296 @@ class Con_solver(Displayable):
         """
         if domains is None:
             domains = self.csp.domains
-        new_domains = self.make_arc_consistent(domains, to_do)
-        if any(len(new_domains[var]) == 0 for var in domains):
+        if to_do is None:
+            to_do = self.all_arcs()
+        counts = self.counts
+        store = Domain_store(domains, counts)
+        counts.count(store)
+        return self.solve_store(store, to_do)
+
+    def solve_store(self, domains, to_do):
+        """return a solution that extends the Domain_store domains or False.
+        Each split is propagated in place and undone from the trail on failure,
+        so no domain dictionary is copied during the search.
+        """
+        if not self.propagate(domains, to_do):
             return False
-        elif all(len(new_domains[var]) == 1 for var in domains):
-            self.display(2, "solution:", {var: select(
-                new_domains[var]) for var in new_domains})
-            return {var: select(new_domains[var]) for var in domains}
+        elif all(len(domains[var]) == 1 for var in domains):
+            solution = {var: select(domains[var]) for var in domains}
+            self.display(2, "solution:", solution)
+            return solution
         else:
-            var = self.select_var(x for x in self.csp.variables if len(new_domains[x]) > 1)
+            var = self.select_var(domains)
             if var:
-                dom1, dom2 = partition_domain(new_domains[var])
+                dom1, dom2 = partition_domain(domains[var])
                 self.display(3, "...splitting", var, "into", dom1, "and", dom2)
-                new_doms1 = copy_with_assign(new_domains, var, dom1)                
-                new_doms2 = copy_with_assign(new_domains, var, dom2)
                 to_do = self.new_to_do(var, None)
                 self.display(3, " adding", to_do if to_do else "nothing", "to to_do.")
-                return self.solve_one(new_doms1, to_do) or self.solve_one(new_doms2, to_do)
+                for dom in [dom1, dom2]:
+                    mark = domains.mark()
+                    domains.assign(var, dom)
+                    solution = self.solve_store(domains, to_do)
+                    if solution:
+                        return solution
+                    domains.undo(mark)
+            return False
+
+    def select_var(self, domains):
+        """return the next variable of domains to split, as given by var_order,
+        or None if every domain has one value"""
+        self.counts.move_to(domains)
+        return self.var_order(self, domains)
+
+    def weighted_degree(self, var, domains):
+        """returns the sum of the weights of the constraints on var that have
+        another variable with more than one value in domains"""
+        self.counts.move_to(domains)
+        return self.counts.wdeg[var]
+
+    def add_weight(self, const):
+        """adds one to the weight of const, which wiped out a domain"""
+        self.weights[const] = self.weights.get(const, 1) + 1
+        self.counts.add_weight(const)
+
+class Arc_queue(object):
+    """The arcs waiting to be revised, cheapest revision first.
+    An arc (var, const) is ordered by the arity of const (unary constraints
+    first), then by the size of the domain of var when it was added, then
+    first in first out. An arc that is already waiting is not added again.
+    * domains is the variable:domain map the arcs are revised against
+    * heap is a heap of (arity, domain size, count, arc) entries
+    * pending is the set of arcs in heap
+    """
+    def __init__(self, domains, arcs=()):
+        self.domains = domains
+        self.heap = []
+        self.pending = set()
+        self.count = 0
+        for arc in arcs:
+            self.add(arc)
+
+    def add(self, arc):
+        """adds arc unless it is already waiting; returns True if it was added"""
+        if arc in self.pending:
+            return False
+        self.pending.add(arc)
+        self.count += 1
+        var, const = arc
+        heapq.heappush(self.heap, (len(const.scope), len(self.domains[var]), self.count, arc))
+        return True
+
+    def pop(self):
+        """removes and returns the cheapest arc"""
+        arc = heapq.heappop(self.heap)[-1]
+        self.pending.discard(arc)
+        return arc
+
+    def __contains__(self, arc):
+        return arc in self.pending
+
+    def __len__(self):
+        return len(self.heap)
+
+class Domain_store(object):
+    """A variable:domain map that records its changes on a trail so that
+    they can be undone in O(changes).
+    * base is the variable:domain dictionary the store starts from; it is never changed
+    * changes is a variable:domain dictionary of the domains assigned since then
+    * trail is a list of (variable, previous domain in changes or None) pairs
+    * watcher, a Split_counts told of the variables that get down to one value
+      and back, or None
+    """
+    def __init__(self, base, watcher=None):
+        self.base = base
+        self.changes = {}
+        self.trail = []
+        self.watcher = watcher
+
+    def __getitem__(self, var):
+        if var in self.changes:
+            return self.changes[var]
+        return self.base[var]
 
-    def select_var(self, iter_vars):
-        """return the next variable to split"""
-        return select(iter_vars)
+    def __iter__(self):
+        return iter(self.base)
 
-def partition_domain(dom):
-    """partitions domain dom into two.
+    def __len__(self):
+        return len(self.base)
+
+    def assign(self, var, dom):
+        """sets the domain of var to dom, recording the previous domain"""
+        if self.watcher is not None:
+            self.watcher.assigned(self, var, self[var], dom)
+        self.trail.append((var, self.changes.get(var)))
+        self.changes[var] = dom
+
+    def mark(self):
+        """returns a mark of the current state that undo() can go back to"""
+        return len(self.trail)
+
+    def undo(self, mark):
+        """restores the domains to what they were when mark was taken"""
+        trail = self.trail
+        changes = self.changes
+        watcher = self.watcher
+        while len(trail) > mark:
+            var, dom = trail.pop()
+            if watcher is not None:
+                watcher.assigned(self, var, changes[var], self.base[var] if dom is None else dom)
+            if dom is None:
+                del changes[var]
+            else:
+                changes[var] = dom
+
+    def changed(self, mark=0):
+        """returns the set of variables assigned since mark was taken"""
+        return {var for (var, _) in self.trail[mark:]}
+
+    def snapshot(self):
+        """returns the current domains as a new variable:domain dictionary"""
+        domains = dict(self.base)
+        domains.update(self.changes)
+        return domains
+
+class Split_counts(object):
+    """What the variable orders count, kept up to date as the domains change
+    instead of being counted again at every split. A variable is fixed when
+    its domain has one value (or none); only the others can be split.
+    * solver, the Con_solver whose constraints and weights are counted
+    * domains, the Domain_map or Domain_store counted, or None before count()
+    * order, a variable:position dictionary of the order of domains
+    * unsplit, the set of the variables that are not fixed
+    * live, a constraint:number of variables of its scope in unsplit dictionary
+    * degree, a variable:number of its constraints with another variable in unsplit dictionary
+    * wdeg, a variable:sum of the weights of those constraints dictionary
+    A Domain_store made with the Split_counts as its watcher reports every
+    variable it fixes, and every variable its undo() frees again; moving to a
+    Domain_map made by updated() from the one counted compares the chunks
+    that are not shared only. Anything else is counted from scratch.
+    """
+    def __init__(self, solver):
+        self.solver = solver
+        self.domains = None
+
+    def count(self, domains):
+        """counts everything from scratch for domains"""
+        csp, weights = self.solver.csp, self.solver.weights
+        self.domains = domains
+        self.order = {var: i for i, var in enumerate(domains)}
+        self.unsplit = unsplit = {var for var in domains if len(domains[var]) > 1}
+        self.live = live = {const: sum(1 for var in const.scope if var in unsplit)
+                            for const in csp.constraints}
+        self.degree = {}
+        self.wdeg = {}
+        for var in domains:
+            others = [const for const in csp.var_to_const.get(var, ())
+                      if live[const] > (var in unsplit)]
+            self.degree[var] = len(others)
+            self.wdeg[var] = sum(weights.get(const, 1) for const in others)
+
+    def move_to(self, domains):
+        """makes the counts those of domains"""
+        old = self.domains
+        if domains is old:
+            return
+        if (isinstance(domains, Domain_map) and isinstance(old, Domain_map)
+                and domains.index is old.index):
+            index = domains.index
+            for i, (was, now) in enumerate(zip(old.chunks, domains.chunks)):
+                if was is not now:
+                    first = i << index.bits
+                    for j, (dom, new) in enumerate(zip(was, now)):
+                        if dom is not new:
+                            self.changed(index.variables[first + j], dom, new)
+            self.domains = domains
+        else:
+            self.count(domains)
+
+    def assigned(self, store, var, dom, new):
+        """the Domain_store store changed the domain of var from dom to new"""
+        if store is self.domains:
+            self.changed(var, dom, new)
+
+    def changed(self, var, dom, new):
+        """updates the counts for the domain of var going from dom to new"""
+        if (len(dom) > 1) != (len(new) > 1):
+            if len(new) > 1:
+                self.free(var)
+            else:
+                self.fix(var)
+
+    def fix(self, var):
+        """var is no longer in unsplit: a constraint on var whose last other
+        unsplit variable it was no longer counts for the variables of its
+        scope (only for the one left in unsplit, if there is one)"""
+        self.unsplit.discard(var)
+        live, unsplit, weights = self.live, self.unsplit, self.solver.weights
+        for const in self.solver.csp.var_to_const[var]:
+            live[const] -= 1
+            if live[const] <= 1:
+                weight = weights.get(const, 1)
+                for other in const.scope:
+                    if other != var and (live[const] == 0 or other in unsplit):
+                        self.degree[other] -= 1
+                        self.wdeg[other] -= weight
+
+    def free(self, var):
+        """var is in unsplit again: undoes fix(var)"""
+        live, unsplit, weights = self.live, self.unsplit, self.solver.weights
+        for const in self.solver.csp.var_to_const[var]:
+            if live[const] <= 1:
+                weight = weights.get(const, 1)
+                for other in const.scope:
+                    if other != var and (live[const] == 0 or other in unsplit):
+                        self.degree[other] += 1
+                        self.wdeg[other] += weight
+            live[const] += 1
+        unsplit.add(var)
+
+    def add_weight(self, const):
+        """the weight of const went up by one"""
+        if self.domains is not None:
+            live, unsplit = self.live[const], self.unsplit
+            for var in const.scope:
+                if live > (var in unsplit):
+                    self.wdeg[var] += 1
+
+def partition_domain(dom, size=None):
+    """partitions domain dom into two, the first with size elements
+    (by default half of them).
+    Domains that know how to split themselves (e.g., Slot_domain) do so.
     """
-    split = len(dom) // 2
+    if hasattr(dom, 'split'):
+        return dom.split(size)
+    split = len(dom) // 2 if size is None else size
     dom1 = set(list(dom)[:split])
     dom2 = dom - dom1
     return dom1, dom2
     
+def filter_domain(dom, condition):
+    """returns the values of domain dom that satisfy condition,
+    in the same representation as dom.
+    """
+    if hasattr(dom, 'filter'):
+        return dom.filter(condition)
+    return {val for val in dom if condition(val)}
+
+def domain_key(dom):
+    """returns a compact hashable key for domain dom"""
+    if isinstance(dom, Slot_domain):
+        return dom.bits
+    if isinstance(dom, Interval_domain):
+        return dom.intervals
+    return frozenset(dom)
+
 def copy_with_assign(domains, var=None, new_domain={True, False}):
     """create a copy of the domains with an assignment var=new_domain
     if var==None then it is just a copy.
+    A Domain_map is not copied: it is immutable, and the copy shares all its
+    domains but that of var.
     """
+    if isinstance(domains, Domain_map):
+        return domains if var is None else domains.updated({var: new_domain})
     newdoms = domains.copy()
     if var is not None:
         newdoms[var] = new_domain
@@ -145,11 +598,27 @@ def select(iterable):
 class Search_with_AC_from_CSP(Search_problem,Displayable):
     """A search problem with arc consistency and domain splitting
 
-    A node is a CSP """
-    def __init__(self, csp):
-        self.cons = Con_solver(csp)  #copy of the CSP
-        self.domains = self.cons.make_arc_consistent()
+    A node is a CSP, as a Domain_map of its domains
+    split_cost is the cost of the arc to each half of a split.
+    The search strategy is given by
+    * var_order, how the variable to split is chosen, one of var_orders
+    * split, how its domain is split, one of splits
+    * value_order, which part of the split is tried first, one of value_orders
+    * seed, the seed of the random choices
+    """
+    split_cost = 1
+
+    def __init__(self, csp, var_order='first', split='halve', value_order='low', seed=None):
+        for name, choices in ((split, splits), (value_order, value_orders)):
+            if name not in choices:
+                raise ValueError(f"unknown strategy {name!r}, expected one of {sorted(choices)}")
+        self.cons = Con_solver(csp, var_order, seed)  #copy of the CSP
+        self.domains = Domain_map(self.cons.make_arc_consistent())
+        self.variables = sorted(csp.variables, key=str)
         self.cost = []
+        self.split = splits[split]
+        self.value_order = value_orders[value_order]
+        self.random = self.cons.random
 
     def is_goal(self, node):
         """node is a goal if all domains have 1 element"""
@@ -160,22 +629,115 @@ class Search_with_AC_from_CSP(Search_problem,Displayable):
     
     def neighbors(self,node):
         """returns the neighboring nodes of node.
+        Both halves of the split are propagated in one Domain_store over node;
+        a branch that fails is undone from the trail without copying node.
         """
         neighs = []
-        var = select(x for x in node if len(node[x])>1)
+        var = self.cons.select_var(node)
         if var:
-            dom1, dom2 = partition_domain(node[var])
-            self.display(2,"Splitting", var, "into", dom1, "and", dom2)
+            doms = self.value_order(self, var, self.split(self, var, node[var]))
+            self.display(2,"Splitting", var, "into", *doms)
             to_do = self.cons.new_to_do(var,None)
-            for dom in [dom1,dom2]:
-                newdoms = copy_with_assign(node,var,dom)
-                cons_doms = self.cons.make_arc_consistent(newdoms,to_do)
-                if all(len(cons_doms[v])>0 for v in cons_doms):
+            domains = Domain_store(node)
+            for dom in doms:
+                mark = domains.mark()
+                domains.assign(var, dom)
+                if self.cons.propagate(domains, to_do):
                     # all domains are non-empty
-                    neighs.append(Arc(node,cons_doms))
+                    neighs.append(Arc(node,self.child_node(node,domains),self.split_cost))
                 else:
                     self.display(2,"...",var,"in",dom,"has no solution")
+                domains.undo(mark)
         return neighs
 
+    def value_cost(self, var, val):
+        """returns the cost of giving var the value val, for cost based
+        orderings; 0 if not overridden"""
+        return 0
+
+    def domain_cost(self, var, dom):
+        """returns the least value_cost() of the values in dom (0 if dom is empty)"""
+        return min((self.value_cost(var, val) for val in dom), default=0)
+
+    def state_key(self, node):
+        """returns the tuple of the domains of node in a fixed variable order,
+        each domain as its bitmask, its intervals or a frozenset.
+        """
+        return tuple(domain_key(node[var]) for var in self.variables)
+
+    def child_node(self, node, domains):
+        """returns the child of node whose domains are in the Domain_store domains
+        (a store over node, whose changes are what propagation pruned).
+        node is a Domain_map, and the child shares every domain that did not change.
+        """
+        return node.updated(domains.changes)
+
+# The variable orders read the unsplit variables, degrees and weighted degrees
+# from solver.counts, which select_var() has moved to domains; ties go to the
+# first variable of domains.
+
+def first_var(solver, domains):
+    """the first variable of domains with more than one value"""
+    counts = solver.counts
+    return min(counts.unsplit, key=counts.order.__getitem__, default=None)
+
+def random_var(solver, domains):
+    """a random variable of domains with more than one value"""
+    counts = solver.counts
+    unsplit = sorted(counts.unsplit, key=counts.order.__getitem__)
+    return solver.random.choice(unsplit) if unsplit else None
+
+def mrv_var(solver, domains):
+    """a variable with the minimum remaining values (of those with more than one)"""
+    order = solver.counts.order
+    return min(solver.counts.unsplit, key=lambda x: (len(domains[x]), order[x]), default=None)
+
+def degree_var(solver, domains):
+    """a variable in the most constraints with other variables that have more
+    than one value; ties go to the fewest remaining values"""
+    counts = solver.counts
+    degree, order = counts.degree, counts.order
+    return min(counts.unsplit, key=lambda x: (-degree[x], len(domains[x]), order[x]), default=None)
+
+def domwdeg_var(solver, domains):
+    """a variable with the minimum ratio of remaining values to weighted degree,
+    where the weight of a constraint counts the domain wipe-outs it caused"""
+    counts = solver.counts
+    wdeg, order = counts.wdeg, counts.order
+    return min(counts.unsplit, key=lambda x: (len(domains[x]) / max(1, wdeg[x]), order[x]), default=None)
+
+def split_halve(problem, var, dom):
+    """partitions dom into two halves"""
+    return partition_domain(dom)
+
+def split_first(problem, var, dom):
+    """partitions dom into its first value and the rest"""
+    return partition_domain(dom, 1)
+
+def split_cheapest(problem, var, dom):
+    """partitions dom into the cheaper half of its values and the rest"""
+    values = sorted(dom, key=lambda val: problem.value_cost(var, val))
+    cheap = set(values[:len(values)//2])
+    return (filter_domain(dom, lambda val: val in cheap),
+            filter_domain(dom, lambda val: val not in cheap))
+
+def low_first(problem, var, doms):
+    return list(doms)
+
+def high_first(problem, var, doms):
+    return list(reversed(doms))
+
+def random_first(problem, var, doms):
+    doms = list(doms)
+    problem.random.shuffle(doms)
+    return doms
 
+def cheapest_first(problem, var, doms):
+    """the parts in increasing order of their cheapest value"""
+    return sorted(doms, key=lambda dom: min((problem.value_cost(var, val) for val in dom), default=0))
 
+var_orders = {'first': first_var, 'random': random_var, 'mrv': mrv_var,
+              'degree': degree_var, 'domwdeg': domwdeg_var}
+splits = {'halve': split_halve, 'first': split_first, 'cheapest': split_cheapest}
+value_orders = {'low': low_first, 'high': high_first, 'random': random_first,
+                'cheapest': cheapest_first}
@@ -0,0 +1,371 @@
+# cspLocalSearch.py - Large neighbourhood search over the schedules of a CSP
+"""
+Complete search splits domains until every variable has one value, so it
+gets slow as the number of variables grows. Local_searcher instead keeps
+one complete, consistent assignment and improves it step by step:
+
+* the first assignment is a dive: the variables are assigned one at a time,
+  each with its cheapest value that propagation accepts. If the dive meets a
+  variable with no such value, it relaxes the neighbourhood of that variable:
+  it goes back to before the first of its neighbours was assigned and goes
+  on from there with the failed variable first. The dive never turns into a
+  complete search; it gives up once it has made repairs repairs, or at once
+  if the first variable has no value
+* a neighbourhood step relaxes a few variables, chosen by constraint graph
+  proximity to a seed variable or by the cost of their values, back to their
+  arc consistent root domains while the other variables keep their values,
+  propagates with the Con_solver of the problem and re-optimizes them with a
+  small depth-first branch and bound. The seed must change its value, so
+  every step is a move
+* a shift step gives one variable another value of its root domain; its
+  hard constraints are checked against the values of the other variables
+  and its cost change is the change of its own value cost, so a shift costs
+  O(degree) to evaluate. A constraint whose condition keeps a profile (a
+  cspResource.Cumulative) is checked against its profile of the current
+  assignment instead, which every move updates, so it costs O(length) and
+  not O(scope)
+
+A move that does not increase the cost is always taken. A worse move is
+taken by simulated annealing with probability exp(-increase/temperature),
+with a cooling temperature, or by tabu search once tenure steps have gone by
+without an improvement; with tabu search a variable that moved cannot be a
+seed again for tenure steps, so the escape is not undone at once.
+
+The best assignment seen is returned, as a path of just its node; it is
+optimal when its cost reaches the bound of the root node. solutions()
+yields every improvement as soon as it is found.
+
+The problem must be a Search_with_AC_from_CSP whose domains are Slot_domains
+or Interval_domains: its cons, its arc consistent root domains, value_cost()
+for the cost of a value, heuristic() and child_node() are used.
+
+Object Class:
+
+Local_searcher -- a searcher that improves one assignment by neighbourhood and shift moves
+
+Functions:
+
+proximity_seed() -- any variable that is not tabu, at random
+cost_seed() -- the costliest of a few variables that are not tabu, drawn at random
+"""
+import math
+from cspConsistency import Domain_store, select
+from searchGeneric import Searcher
+from searchProblem import Path
+
+class Local_searcher(Searcher):
+    """returns a local searcher for a Search_with_AC_from_CSP problem.
+    * iterations is the number of steps; budget, a Budget, can stop it earlier
+    * neighbourhood is the number of variables a neighbourhood step relaxes
+    * choose is how the seed of a neighbourhood is chosen, one of seeds
+    * acceptance is 'anneal' or 'tabu'
+    * temperature is the initial temperature of annealing (by default the mean
+      cost of the values that cost anything), multiplied by cooling every step
+    * tenure is the number of steps a moved variable is tabu
+    * shift_rate is the fraction of the steps that are shift steps
+    * max_nodes is the number of values a neighbourhood step may try
+    * repairs is the number of neighbourhoods the dive may relax
+    * bound is an upper bound: only assignments that cost less are returned
+    After search(), num_expanded counts the values tried by the dive and by
+    every neighbourhood step, and optimal is True if the assignment is proven optimal.
+    """
+    def __init__(self, problem, iterations=5000, budget=None, neighbourhood=8,
+                 choose='mixed', acceptance='anneal', temperature=None, cooling=0.995,
+                 tenure=10, shift_rate=0.5, max_nodes=50, repairs=1000, seed=None,
+                 bound=float('inf')):
+        if choose not in seeds and choose != 'mixed':
+            raise ValueError(f"unknown choose {choose!r}, expected 'mixed' or one of {sorted(seeds)}")
+        if acceptance not in ('anneal', 'tabu'):
+            raise ValueError(f"unknown acceptance {acceptance!r}, expected 'anneal' or 'tabu'")
+        super().__init__(problem, budget=budget)
+        self.iterations = iterations
+        self.neighbourhood = neighbourhood
+        self.choose = choose
+        self.acceptance = acceptance
+        self.temperature = temperature
+        self.cooling = cooling
+        self.tenure = tenure
+        self.shift_rate = shift_rate
+        self.max_nodes = max_nodes
+        self.repairs = repairs
+        self.bound = bound
+        self.random = problem.random if seed is None else type(problem.random)(seed)
+        self.optimal = False
+
+    def search(self):
+        """returns a path of just the node of the best assignment found, or None
+        if no first assignment was found or none costs less than bound"""
+        found = False
+        for cost in self.improvements():
+            found = cost < self.bound
+        self.solution = self.path(self.best) if found else None
+        return self.solution
+
+    def solutions(self):
+        """yields (path, cost, elapsed seconds) for the first assignment and
+        then for every assignment cheaper than the ones before, until the
+        steps or the budget run out"""
+        for cost in self.improvements():
+            if cost < self.bound:
+                self.solution = self.path(self.best)
+                yield self.solution, cost, self.budget.elapsed()
+
+    def improvements(self):
+        """yields the cost of the first assignment and then of every assignment
+        cheaper than the ones before, whose var:domain dict is then best"""
+        problem = self.problem
+        self.root = root = problem.start_node()
+        self.num_expanded = 0
+        self.optimal = False
+        self.budget.start()
+        if not all(root.values()):
+            return
+        values = self.dive()
+        if values is None:
+            return
+        self.values = values                   # var:value of the current assignment
+        self.variables = sorted(values, key=str)
+        self.node = {var: root[var].within(0, val[0], val[0]) for var, val in values.items()}
+        self.costs = {var: problem.value_cost(var, val) for var, val in values.items()}
+        self.profiles = {const: const.condition.usage([values[var] for var in const.scope])
+                         for const in problem.cons.csp.constraints
+                         if hasattr(const.condition, 'usage')}   # const:its profile
+        self.cost = sum(self.costs.values())
+        self.tabu = {}                         # var:the step it stops being tabu at
+        self.stalled = 0                       # the steps since the cost last decreased
+        self.best, best_cost = dict(self.node), self.cost
+        lower = problem.heuristic(root)
+        if self.temperature is None:
+            paying = [cost for cost in self.costs.values() if cost > 0]
+            self.temperature = sum(paying) / len(paying) if paying else 1
+        self.display(1, "First assignment cost:", self.cost)
+        self.optimal = best_cost <= lower
+        yield best_cost
+        for self.step in range(self.iterations):
+            if self.optimal or self.out_of_budget():
+                break
+            cost = self.cost
+            if self.random.random() < self.shift_rate:
+                self.shift_step()
+            else:
+                self.neighbourhood_step()
+            self.stalled = 0 if self.cost < cost else self.stalled + 1
+            if self.cost < best_cost:
+                self.best, best_cost = dict(self.node), self.cost
+                self.optimal = best_cost <= lower
+                self.display(2, "Step", self.step, "new best cost:", best_cost)
+                yield best_cost
+            self.temperature *= self.cooling
+        self.display(1, "Best cost:", best_cost, "after", self.num_expanded, "nodes")
+
+    def path(self, node):
+        """returns a path of just the child of the root with the domains of node"""
+        root = self.root
+        store = Domain_store(root)
+        for var, dom in node.items():
+            if dom != root[var]:
+                store.assign(var, dom)
+        return Path(self.problem.child_node(root, store))
+
+    def dive(self):
+        """returns a var:value dict of a consistent assignment, found by giving
+        the variables their cheapest value that propagation accepts in turn and
+        relaxing the neighbourhood of a variable that has none, or None if the
+        repairs or the budget ran out first"""
+        domains = Domain_store(self.root)
+        order = sorted(self.root, key=lambda var: (len(self.root[var]), str(var)))
+        marks = []          # marks[i] is the mark of domains before order[i] was assigned
+        repairs = 0
+        while len(marks) < len(order):
+            if self.out_of_budget():
+                return None
+            position = len(marks)
+            var = order[position]
+            marks.append(domains.mark())
+            if self.assign_cheapest(domains, var):
+                continue
+            if position == 0 or repairs == self.repairs:
+                self.display(1, "The dive failed at", var, "after", repairs, "repairs")
+                return None
+            repairs += 1
+            near = set(self.around(var))
+            first = min((i for i in range(position) if order[i] in near),
+                        default=max(0, position - self.neighbourhood))
+            self.display(2, "The dive failed at", var, "; relaxing from", order[first])
+            domains.undo(marks[first])
+            del marks[first:]
+            order.remove(var)
+            order.insert(first, var)
+        return {var: select(domains[var]) for var in self.root}
+
+    def assign_cheapest(self, domains, var):
+        """gives var its cheapest value in the Domain_store domains that
+        propagation accepts; returns False, with domains unchanged, if it has none"""
+        problem, cons = self.problem, self.problem.cons
+        dom = domains[var]
+        if dom.is_singleton():
+            return True
+        for val in sorted(dom, key=lambda val: problem.value_cost(var, val)):
+            self.num_expanded += 1
+            mark = domains.mark()
+            domains.assign(var, dom.within(0, val[0], val[0]))
+            if cons.propagate(domains, cons.new_to_do(var, None)):
+                return True
+            domains.undo(mark)
+        return False
+
+    def seed(self):
+        """returns the seed variable of a step, chosen by self.choose"""
+        choose = self.choose
+        if choose == 'mixed':
+            choose = self.random.choice(sorted(seeds))
+        return seeds[choose](self)
+
+    def is_tabu(self, var):
+        return self.acceptance == 'tabu' and self.tabu.get(var, 0) > self.step
+
+    def accept(self, increase):
+        """is True if a move that increases the cost by increase is taken"""
+        if increase <= 0:
+            return True
+        if self.acceptance == 'tabu':
+            if self.stalled < self.tenure:
+                return False
+            self.stalled = 0
+            return True
+        return self.random.random() < math.exp(-increase / max(self.temperature, 1e-9))
+
+    def moved(self, var, val):
+        """gives var the value val in the current assignment"""
+        for const in self.problem.cons.csp.var_to_const[var]:
+            if const in self.profiles:
+                const.condition.move(self.profiles[const], self.values[var], val)
+        self.values[var] = val
+        self.node[var] = self.root[var].within(0, val[0], val[0])
+        cost = self.problem.value_cost(var, val)
+        self.cost += cost - self.costs[var]
+        self.costs[var] = cost
+        self.tabu[var] = self.step + self.tenure
+
+    def violated(self, var, val):
+        """is True if giving var the value val violates a constraint on var,
+        given the values of the other variables"""
+        values, profiles = self.values, self.profiles
+        old, values[var] = values[var], val
+        try:
+            return any(not const.condition.fits(profiles[const], old, val) if const in profiles
+                       else not const.holds(values)
+                       for const in self.problem.cons.csp.var_to_const[var])
+        finally:
+            values[var] = old
+
+    def shift_step(self):
+        """moves the seed to another value of its root domain that violates no
+        constraint: a random one with annealing, the cheapest one with tabu"""
+        var = self.seed()
+        if var is None or len(self.root[var]) < 2:
+            return
+        current = self.values[var]
+        if self.acceptance == 'anneal':
+            candidates = [self.random.choice(list(self.root[var]))]
+        else:
+            candidates = sorted(self.root[var], key=lambda val: self.problem.value_cost(var, val))
+        for val in candidates:
+            if val != current and not self.violated(var, val):
+                if self.accept(self.problem.value_cost(var, val) - self.costs[var]):
+                    self.moved(var, val)
+                return
+
+    def neighbourhood_step(self):
+        """relaxes the seed and the variables closest to it in the constraint
+        graph, and moves them to their best values found, the seed to a new one"""
+        seed = self.seed()
+        if seed is None or len(self.root[seed]) < 2:
+            return
+        relaxed = self.around(seed)
+        cons = self.problem.cons
+        domains = Domain_store(self.node)
+        start = self.values[seed][0]
+        domains.assign(seed, self.root[seed].without(0, start, start))
+        for var in relaxed[1:]:
+            domains.assign(var, self.root[var])
+        to_do = {(var, const) for var in relaxed for const in cons.csp.var_to_const[var]}
+        if not cons.propagate(domains, to_do):
+            return
+        old_cost = sum(self.costs[var] for var in relaxed)
+        found = self.reoptimize(domains, relaxed)
+        if found is not None and self.accept(sum(self.problem.value_cost(var, val)
+                                                 for var, val in found.items()) - old_cost):
+            for var, val in found.items():
+                self.moved(var, val)
+
+    def around(self, seed):
+        """returns a list of seed and of the variables nearest to it in the
+        constraint graph, at most neighbourhood of them, seed first"""
+        var_to_const = self.problem.cons.csp.var_to_const
+        relaxed = [seed]
+        seen = {seed}
+        for var in relaxed:
+            others = [other for const in var_to_const[var] for other in const.scope
+                      if other not in seen]
+            self.random.shuffle(others)
+            for other in others:
+                if len(relaxed) == self.neighbourhood:
+                    return relaxed
+                if other not in seen:
+                    seen.add(other)
+                    relaxed.append(other)
+        return relaxed
+
+    def reoptimize(self, domains, relaxed):
+        """returns the var:value dict of the cheapest assignment of the variables
+        of relaxed found by a depth-first branch and bound that tries at most
+        max_nodes values over the Domain_store domains, or None if it found none"""
+        problem, cons = self.problem, self.problem.cons
+        best = [None, float('inf')]
+        nodes = [self.max_nodes]
+
+        def branch(unassigned, cost):
+            if not unassigned:
+                if cost < best[1]:
+                    best[:] = [{var: select(domains[var]) for var in relaxed}, cost]
+                return
+            var = min(unassigned, key=lambda var: len(domains[var]))
+            rest = [other for other in unassigned if other != var]
+            rest_bound = sum(problem.domain_cost(other, domains[other]) for other in rest)
+            dom = domains[var]
+            for val in sorted(dom, key=lambda val: (problem.value_cost(var, val), self.random.random())):
+                val_cost = problem.value_cost(var, val)
+                if nodes[0] <= 0 or cost + val_cost + rest_bound >= best[1]:
+                    return      # the values left cost no less
+                nodes[0] -= 1
+                self.num_expanded += 1
+                mark = domains.mark()
+                domains.assign(var, dom.within(0, val[0], val[0]))
+                if cons.propagate(domains, cons.new_to_do(var, None)):
+                    fixed = [other for other in rest if domains[other].is_singleton()]
+                    branch([other for other in rest if other not in fixed],
+                           cost + val_cost + sum(problem.value_cost(other, select(domains[other]))
+                                                 for other in fixed))
+                domains.undo(mark)
+
+        fixed = [var for var in relaxed if domains[var].is_singleton()]
+        branch([var for var in relaxed if var not in fixed],
+               sum(problem.value_cost(var, select(domains[var])) for var in fixed))
+        return best[0]
+
+# any variable that is not tabu, at random
+def proximity_seed(searcher):
+    for _ in range(10):
+        var = searcher.random.choice(searcher.variables)
+        if not searcher.is_tabu(var):
+            return var
+    variables = [var for var in searcher.variables if not searcher.is_tabu(var)]
+    return searcher.random.choice(variables) if variables else None
+
+# the variable whose value costs most of a few variables that are not tabu, drawn at random
+def cost_seed(searcher):
+    drawn = [var for var in (proximity_seed(searcher) for _ in range(8)) if var is not None]
+    return max(drawn, key=lambda var: searcher.costs[var]) if drawn else None
+
+seeds = {'proximity': proximity_seed, 'cost': cost_seed}
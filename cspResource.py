@@ -0,0 +1,255 @@
+# cspResource.py - A global resource capacity constraint with timetabling
+"""
+A resource (a person, a room) can be used by at most capacity of its tasks at
+any time; with a capacity of 1 its tasks must not overlap. Stating this with
+a binary constraint between every two tasks of the resource gives O(n^2)
+arcs that arc consistency revises again and again; Cumulative is one
+constraint over all of them instead.
+
+Cumulative is the condition of a Constraint whose scope is the tasks of the
+resource. Called with a (start, end) value of every task it is True when no
+time is used by more than capacity of them, so the Constraint can be checked
+like any other. Con_solver does not revise its arcs; it calls propagate()
+whenever the domain of one of the tasks changes. A search that moves one
+task at a time keeps the profile of the resource, usage(), and checks a move
+with fits() and makes it with move(), in O(length) instead of O(n length).
+
+propagate() is timetabling: a task whose latest start is before its earliest
+end occupies the times from one to the other whatever value it gets (its
+compulsory part). Adding up the compulsory parts gives the profile of the
+resource, swept from the sorted starts and ends of the compulsory parts; a
+time where the profile reaches the capacity is full, and every value of a
+task that occupies a full time outside its own compulsory part is removed.
+A task of no length occupies no time, so it is never cut. Sorting the
+events takes O(n log n) for n tasks, and the cuts O(n r) for r full runs,
+each a domain cut.
+
+Timetabling only sees the tasks whose domains are already narrow. propagate()
+then reasons on energy, the length of a task, which it must spend between
+its earliest start and its latest end: for every window [a, b) from an
+earliest start to a latest end, the tasks that lie inside it need their
+whole energy in it, and the resource offers capacity times the working time
+of the window. More than that is an overload and fails at once; what is
+left, the slack, bounds the overlap of any other task with the window, so
+the starts of a task that would overlap it by more than the slack are
+removed. The compulsory parts of the narrow tasks count in every window
+they meet, so only the earliest starts and latest ends of the other tasks
+make windows, and a window is skipped when a longer one from the same start
+has no more slack. Overload is found in O(n e) for e windows,
+and only the windows whose slack is less than the longest task can cut, in
+O(n) each.
+
+Object Class:
+
+Cumulative -- the condition of a resource constraint, with its propagator
+"""
+
+class Cumulative(object):
+    """A Cumulative consists of
+    * name, the name of the resource
+    * capacity, the number of its tasks that can run at the same time
+    * working_time, a function (low, high) returning how much of the times
+      from low to high (excluded) tasks can occupy, e.g. the working time of
+      a Calendar; by default all of them, high - low
+    """
+    def __init__(self, name, capacity, working_time=None):
+        self.name = name
+        self.capacity = capacity
+        self.working_time = working_time
+        self.__name__ = 'resource_' + name
+
+    def __call__(self, *values):
+        """is True if no time is occupied by more than capacity of values"""
+        return all(used <= self.capacity for used in self.usage(values).values())
+
+    def usage(self, values):
+        """returns the profile of the (start, end) values, a time:number of
+        values occupying it dictionary"""
+        usage = {}
+        for start, end in values:
+            for time in range(start, end):
+                usage[time] = usage.get(time, 0) + 1
+        return usage
+
+    def fits(self, usage, old, new):
+        """is True if the profile usage, a profile within the capacity, stays
+        within it when its value old is replaced by new"""
+        capacity = self.capacity
+        return all(usage.get(time, 0) < capacity for time in range(new[0], new[1])
+                   if not old[0] <= time < old[1])
+
+    def move(self, usage, old, new):
+        """replaces the value old of the profile usage by new, in place"""
+        for time in range(old[0], old[1]):
+            usage[time] -= 1
+        for time in range(new[0], new[1]):
+            usage[time] = usage.get(time, 0) + 1
+
+    def propagate(self, domains, scope):
+        """removes from the domains of the tasks of scope the values that
+        occupy a time the compulsory parts of the other tasks already fill,
+        then the values that overlap a window by more than its slack (see
+        energy()), assigning every cut domain in the Domain_store domains.
+        returns the set of tasks whose domains were cut, or None if a domain
+        is empty, the compulsory parts alone exceed the capacity or a window
+        is overloaded.
+        """
+        if self.capacity < 1:
+            return None if scope else set()
+        spans = {}          # task:(earliest start, latest start, length) of the tasks that occupy time
+        for task in scope:
+            dom = domains[task]
+            if not dom:
+                return None
+            earliest, latest = dom.bounds(0)
+            length = dom.bounds(1)[0] - earliest
+            if length > 0:      # a task of no length occupies no time
+                spans[task] = (earliest, latest, length)
+        changed = self.timetable(domains, spans)
+        if changed is None:
+            return None
+        cut = self.energy(domains, spans)
+        if cut is None:
+            return None
+        return changed | cut
+
+    def timetable(self, domains, spans):
+        """removes the values that occupy a time the compulsory parts of the
+        other tasks fill, updating spans, the task:(earliest start, latest
+        start, length) dictionary of the tasks that occupy time.
+        returns the set of tasks cut, or None as propagate()
+        """
+        events = []
+        compulsory = {}     # task:(first time, time after) of its compulsory part
+        for task, (earliest, latest, length) in spans.items():
+            if latest < earliest + length:
+                compulsory[task] = (latest, earliest + length)
+                events.append((latest, 1))
+                events.append((earliest + length, -1))
+        full = []           # the (first time, time after) runs where the profile reaches the capacity
+        used = 0
+        events.sort()
+        for k, (time, change) in enumerate(events):
+            used += change
+            if used > self.capacity:
+                return None
+            if used == self.capacity and k + 1 < len(events) and events[k + 1][0] > time:
+                if full and full[-1][1] == time:
+                    full[-1] = (full[-1][0], events[k + 1][0])
+                else:
+                    full.append((time, events[k + 1][0]))
+        changed = set()
+        if not full:
+            return changed
+        for task, (earliest, latest, length) in spans.items():
+            dom = domains[task]
+            cut = dom
+            own_first, own_after = compulsory.get(task, (0, 0))
+            for first, after in full:
+                for low, high in ((first, min(after, own_first)), (max(first, own_after), after)):
+                    if low < high and low - length + 1 <= latest and high - 1 >= earliest:
+                        # the values that start before high and end after low
+                        cut = cut.without(0, low - length + 1, high - 1)
+            if cut != dom:
+                domains.assign(task, cut)
+                if not cut:
+                    return None
+                spans[task] = cut.bounds(0) + (length,)
+                changed.add(task)
+        return changed
+
+    def energy(self, domains, spans):
+        """removes the values that overlap a window by more than its slack;
+        spans is as in timetable().
+        returns the set of tasks cut, or None if a window is overloaded.
+        """
+        if not spans:
+            return set()
+        # (latest end, earliest start, latest start, length, length outside the compulsory part, task)
+        tasks = sorted((latest + length, earliest, latest, length, min(length, latest - earliest), task)
+                       for task, (earliest, latest, length) in spans.items())
+        # the windows that start or end elsewhere than the tasks with energy outside
+        # their compulsory parts have more slack than the nearest ones that do
+        loose = [task for task in tasks if task[4]]
+        if not loose:
+            return set()
+        longest = max(task[3] for task in tasks)
+        starts = sorted({task[1] for task in loose})
+        times = set(starts).union(task[0] for task in loose)
+        # the working time and the compulsory energy from the first earliest start
+        # to every earliest start and latest end
+        origin = starts[0]
+        if self.working_time is None:
+            elapsed = {time: time - origin for time in times}
+        else:
+            elapsed = {time: self.working_time(origin, time) for time in times}
+        spent = compulsory_energy(tasks, times)
+        capacity = self.capacity
+        tight = []          # (a, b, slack) of the windows that can cut
+        for a in starts:
+            free = 0        # the energy outside their compulsory parts of the tasks inside [a, b)
+            before, spent_before = elapsed[a], spent[a]
+            windows = []    # (b, slack) of the windows from a, b increasing
+            for b, earliest, _, _, outside, _ in loose:
+                if earliest >= a:
+                    free += outside
+                    slack = capacity * (elapsed[b] - before) - free - (spent[b] - spent_before)
+                    if slack < 0:
+                        return None
+                    if windows and windows[-1][0] == b:
+                        windows[-1] = (b, slack)
+                    else:
+                        windows.append((b, slack))
+            # a window cuts no more than a window from a that contains it with no more slack
+            least = longest
+            for b, slack in reversed(windows):
+                if slack < least:
+                    tight.append((a, b, slack))
+                    least = slack
+        changed = set()
+        for a, b, slack in tight:
+            for latest_end, earliest, latest, length, outside, task in tasks:
+                if (length <= slack or earliest >= a and latest_end <= b
+                        or a - length + slack >= latest or b - slack <= earliest):
+                    continue
+                allowed = slack
+                if outside < length:
+                    # the compulsory part of the task in the window is already in its energy
+                    allowed += max(0, min(b, earliest + length) - max(a, latest))
+                if length <= allowed or b - a <= allowed:
+                    continue
+                # the starts from low to high overlap the window by more than allowed
+                low, high = a - length + allowed + 1, b - allowed - 1
+                if low <= latest and high >= earliest:
+                    dom = domains[task]
+                    cut = dom.without(0, low, high)
+                    if cut != dom:
+                        domains.assign(task, cut)
+                        if not cut:
+                            return None
+                        changed.add(task)
+        return changed
+
+# the energy of the compulsory parts of tasks before each of times
+def compulsory_energy(tasks, times):
+    """returns a time:energy dictionary of the energy the compulsory parts
+    of tasks, the tuples of Cumulative.energy(),
+    spend before every time of times"""
+    events = []
+    for _, earliest, latest, length, _, _ in tasks:
+        if latest < earliest + length:
+            events.append((latest, 1))
+            events.append((earliest + length, -1))
+    events.sort()
+    spent = {}
+    energy = height = 0
+    previous = None
+    k = 0
+    for time in sorted(times):
+        while k < len(events) and events[k][0] <= time:
+            if previous is not None:
+                energy += height * (events[k][0] - previous)
+            previous, height = events[k][0], height + events[k][1]
+            k += 1
+        spent[time] = energy + (height * (time - previous) if previous is not None else 0)
+    return spent
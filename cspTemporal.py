@@ -0,0 +1,126 @@
+# cspTemporal.py - Bounds propagation of difference constraints between starts
+"""
+Precedences between tasks (before, after, starts-at) are difference
+constraints: each is one or more inequalities
+
+    val_x[field_x] - val_y[field_y] <= weight
+
+between the (start, end) values of two tasks. A condition declares them in a
+differences attribute, a tuple of ((i, field_i), (j, field_j), weight)
+triples over the positions i, j of its scope; the condition must hold exactly
+when all of its differences hold. As the end of every value of a task domain
+is its start plus the same duration, each difference is one edge between the
+starts of two tasks.
+
+The domains must be Slot_domains or Interval_domains, which provide bounds()
+and within() on the start and the end of their values.
+
+Temporal_network propagates the edges on the bounds of the start of each
+task: the latest start of x is at most the latest start of y plus the weight,
+and the earliest start of y is at least the earliest start of x minus it.
+Every bound that moves cuts the domain with within(), so the
+bounds always follow the values that remain, and a chain of precedences
+reaches its fixpoint in one sweep along the chain.
+
+A constraint with a single difference is enforced completely by its bounds,
+so Con_solver does not revise its arcs; the arcs of a constraint with more
+than one (an equality such as starts-at) are still revised for the values
+inside the bounds.
+
+A cycle of edges of negative total weight can never be satisfied; it is
+found once, when the network is built, and makes every propagation fail.
+
+Object Class:
+
+Temporal_network -- the difference constraints of a CSP and their propagation
+
+Functions:
+
+start_offset() -- the difference between a field of the values of a domain and their start
+"""
+from collections import deque
+
+class Temporal_network(object):
+    """A Temporal_network consists of
+    * upper, a var:list of (x, weight) pairs, one for each edge
+      start[x] - start[var] <= weight, which bounds the latest start of x
+    * lower, a var:list of (y, weight) pairs, one for each edge
+      start[var] - start[y] <= weight, which bounds the earliest start of y
+    * scopes, a constraint:scope dictionary of the constraints with differences
+    * exact, the set of those constraints that are enforced by their bounds
+    * consistent, False if the edges have a negative cycle
+    """
+    def __init__(self, csp):
+        self.upper = {}
+        self.lower = {}
+        self.scopes = {}
+        self.exact = set()
+        for const in csp.constraints:
+            differences = getattr(const.condition, 'differences', None)
+            if differences is None or not all(hasattr(csp.domains[var], 'within') and csp.domains[var]
+                                              for var in const.scope):
+                continue
+            for (i, field_i), (j, field_j), weight in differences:
+                x, y = const.scope[i], const.scope[j]
+                weight += (start_offset(csp.domains[y], field_j)
+                           - start_offset(csp.domains[x], field_i))
+                self.upper.setdefault(y, []).append((x, weight))
+                self.lower.setdefault(x, []).append((y, weight))
+            self.scopes[const] = const.scope
+            if len(differences) == 1:
+                self.exact.add(const)
+        self.consistent = not self.negative_cycle()
+
+    def negative_cycle(self):
+        """is True if the edges have a cycle of negative weight (Bellman-Ford
+        from a source with an edge of weight 0 to every start)
+        """
+        variables = set(self.upper) | set(self.lower)
+        distance = {var: 0 for var in variables}
+        for _ in range(len(variables)):
+            relaxed = False
+            for y, edges in self.upper.items():
+                for x, weight in edges:
+                    if distance[y] + weight < distance[x]:
+                        distance[x] = distance[y] + weight
+                        relaxed = True
+            if not relaxed:
+                return False
+        return True
+
+    def propagate(self, domains, moved):
+        """tightens the start bounds of the tasks reachable from the tasks in
+        moved, whose domains have changed, assigning every cut domain in the
+        Domain_store domains.
+        returns the set of tasks whose domains were cut, or None as soon as a
+        domain becomes empty.
+        """
+        if not self.consistent:
+            return None
+        changed = set()
+        queue = deque(moved)
+        queued = set(moved)
+        while queue:
+            var = queue.popleft()
+            queued.discard(var)
+            if not domains[var]:
+                return None
+            earliest, latest = domains[var].bounds(0)
+            cuts = [(x, None, latest + weight) for x, weight in self.upper.get(var, ())]
+            cuts += [(y, earliest - weight, None) for y, weight in self.lower.get(var, ())]
+            for other, low, high in cuts:
+                dom = domains[other]
+                cut = dom.within(0, low, high)
+                if cut != dom:
+                    domains.assign(other, cut)
+                    if not cut:
+                        return None
+                    changed.add(other)
+                    if other not in queued:
+                        queue.append(other)
+                        queued.add(other)
+        return changed
+
+# the difference between val[field] and val[0] for every value val of a non-empty task domain
+def start_offset(dom, field):
+    return dom.bounds(field)[0] - dom.bounds(0)[0]
@@ -0,0 +1,103 @@
+# domainMap.py - Persistent variable:domain maps with structural sharing
+"""
+A node of a search with arc consistency is a variable:domain map, and its
+children differ from it in the few domains that splitting and propagation
+changed. When every node is a dict of its own, each child copies all the
+domains, and a best-first frontier of many nodes holds as many full copies.
+
+A Domain_map is an immutable variable:domain map stored as a chunked
+copy-on-write array: the variables have fixed positions (a Var_index shared
+by the whole search), the domains are stored in chunks of 2**bits of them,
+and the map is the list of its chunks. updated() copies that list and the
+chunks of the changed variables only; every other chunk is shared with the
+parent. A child then takes O(n / 2**bits + changes * 2**bits) time and
+memory for n variables, instead of O(n); bits is about half of the bits of
+n, so that both terms are about the square root of n.
+
+Reading a domain is a position lookup and two list indexes. A Domain_map is
+a collections.abc.Mapping, so it iterates, compares and gives items() as a
+dict does; it is changed only by making a new one with updated().
+
+Object Class:
+
+Var_index -- the positions of the variables of a family of Domain_maps
+Domain_map -- an immutable variable:domain map whose updates share the unchanged chunks
+"""
+from collections.abc import Mapping
+
+class Var_index(object):
+    """A Var_index consists of
+    * variables, the tuple of the variables in position order
+    * position, a variable:position dictionary
+    * bits, the log2 of the number of domains in a chunk
+    * mask, the mask of the position of a variable in its chunk
+    """
+    __slots__ = ('variables', 'position', 'bits', 'mask')
+
+    def __init__(self, variables):
+        self.variables = tuple(variables)
+        self.position = {var: i for i, var in enumerate(self.variables)}
+        self.bits = max(2, (len(self.variables).bit_length() + 1) // 2)
+        self.mask = (1 << self.bits) - 1
+
+class Domain_map(Mapping):
+    """A Domain_map consists of
+    * index, the Var_index of its variables, shared with the maps made from it
+    * chunks, the list of the lists of the domains in position order; neither
+      is ever changed once the map is made, so they can be shared
+    """
+    __slots__ = ('index', 'chunks')
+
+    def __init__(self, domains=()):
+        """domains is a variable:domain mapping or an iterable of (variable,
+        domain) pairs; a Domain_map is shared, not copied"""
+        if isinstance(domains, Domain_map):
+            self.index, self.chunks = domains.index, domains.chunks
+            return
+        domains = dict(domains)
+        self.index = index = Var_index(domains)
+        values = [domains[var] for var in index.variables]
+        size = 1 << index.bits
+        self.chunks = [values[start:start + size] for start in range(0, len(values), size)]
+
+    def __getitem__(self, var):
+        index = self.index
+        i = index.position[var]
+        return self.chunks[i >> index.bits][i & index.mask]
+
+    def __contains__(self, var):
+        return var in self.index.position
+
+    def __iter__(self):
+        return iter(self.index.variables)
+
+    def __len__(self):
+        return len(self.index.variables)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def updated(self, changes):
+        """returns a map of the same class with the domains of the variable:domain
+        dictionary changes instead of those of self, sharing the unchanged chunks.
+        A variable that self does not have gives a new map with a new Var_index.
+        """
+        index = self.index
+        position, bits, mask = index.position, index.bits, index.mask
+        chunks = self.chunks[:]
+        copied = set()
+        for var, dom in changes.items():
+            i = position.get(var)
+            if i is None:
+                domains = dict(self.items())
+                domains.update(changes)
+                return self.__class__(domains)
+            chunk = i >> bits
+            if chunk not in copied:
+                chunks[chunk] = chunks[chunk][:]
+                copied.add(chunk)
+            chunks[chunk][i & mask] = dom
+        child = self.__class__.__new__(self.__class__)
+        child.index = index
+        child.chunks = chunks
+        return child
@@ -0,0 +1,140 @@
+"""
+This module solves many fuzzy scheduling instances in parallel across a pool of
+worker processes, writing one JSON Lines record per instance.
+
+Each worker imports fuzzyScheduler once and then solves instance after
+instance, so there is no interpreter start or import per file.
+
+Usage:
+
+python fuzzyBatch.py inputs/ 'more/*.txt' @manifest.txt --workers 8 --timeout 30 -o results.jsonl
+
+* a directory stands for all the *.txt files in it
+* a glob stands for the files it matches
+* @file stands for the files listed in file, one per line
+* anything else is a file name
+
+A record has the keys instance, status ('solved', 'no solution', 'timeout' or
+'error'), schedule (task:'day time'), cost, time (seconds) and nodes_expanded;
+an 'error' record also has the message in error.
+
+Functions:
+
+instance_files() -- expand directories, globs and manifests into a list of files
+solve_instance() -- solve one file in a worker, returning its record
+solution_record() -- the status, schedule, cost and nodes expanded of a solve() result
+solve_batch() -- solve files across a process pool, yielding records as they finish
+main() -- the command line
+"""
+import argparse
+import glob
+import json
+import os
+import signal
+import sys
+import time
+from multiprocessing import Pool
+from fuzzyScheduler import parse, solve, schedule_of, searchers
+
+class Instance_timeout(Exception):
+    """raised in a worker when an instance runs out of time"""
+
+def raise_timeout(signum, frame):
+    raise Instance_timeout()
+
+# expand directories, globs and @manifests into the list of instance files
+def instance_files(sources):
+    files = []
+    for source in sources:
+        if source.startswith('@'):
+            with open(source[1:], 'r') as manifest:
+                files.extend(line.strip() for line in manifest
+                             if line.strip() and not line.startswith('#'))
+        elif os.path.isdir(source):
+            files.extend(sorted(glob.glob(os.path.join(source, '*.txt'))))
+        elif glob.has_magic(source):
+            files.extend(sorted(glob.glob(source)))
+        else:
+            files.append(source)
+    return files
+
+# solve one instance file; runs in a worker process
+def solve_instance(filename, searcher='greedy', timeout=None):
+    """returns the record of filename solved with searchers[searcher].
+    timeout is the number of seconds the instance may take (None for no limit);
+    it is enforced with a SIGALRM timer inside the worker.
+    """
+    record = {'instance': filename, 'status': None, 'schedule': None,
+              'cost': None, 'time': None, 'nodes_expanded': None}
+    start = time.perf_counter()
+    if timeout:
+        signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        with open(filename, 'r') as file:
+            problem = parse(file)
+        record.update(solution_record(*solve(problem, searcher)))
+    except Instance_timeout:
+        record['status'] = 'timeout'
+    except Exception as error:
+        record['status'] = 'error'
+        record['error'] = f'{type(error).__name__}: {error}'
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    record['time'] = time.perf_counter() - start
+    return record
+
+# the solution part of a record
+def solution_record(path, searcher):
+    """returns the status, schedule, cost and nodes_expanded of a record, given
+    the (path, searcher) returned by solve()
+    """
+    if path is None:
+        return {'status': 'no solution', 'schedule': None, 'cost': None,
+                'nodes_expanded': searcher.num_expanded}
+    return {'status': 'solved', 'schedule': schedule_of(path.end(), searcher.problem.calendar),
+            'cost': searcher.problem.heuristic(path.end()),
+            'nodes_expanded': searcher.num_expanded}
+
+def solve_instance_args(args):
+    return solve_instance(*args)
+
+# solve files across a process pool
+def solve_batch(files, searcher='greedy', workers=None, timeout=None):
+    """yields the record of every file as soon as it is solved.
+    workers is the number of processes (None for one per core).
+    """
+    if searcher == 'parallel':
+        # the parallel searcher starts processes of its own, which pool workers may not
+        raise ValueError("the parallel searcher cannot run in a pool worker")
+    with Pool(workers) as pool:
+        jobs = ((filename, searcher, timeout) for filename in files)
+        for record in pool.imap_unordered(solve_instance_args, jobs):
+            yield record
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve many fuzzy scheduling instances in parallel")
+    parser.add_argument('sources', nargs='+',
+                        help="instance files, directories, globs or @manifest files")
+    parser.add_argument('--searcher', default='greedy',
+                        choices=sorted(name for name in searchers if name != 'parallel'))
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes (default: one per core)")
+    parser.add_argument('--timeout', type=float, default=None,
+                        help="seconds allowed per instance")
+    parser.add_argument('-o', '--output', default=None,
+                        help="JSON Lines file to write (default: standard output)")
+    args = parser.parse_args(argv)
+    files = instance_files(args.sources)
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for record in solve_batch(files, args.searcher, args.workers, args.timeout):
+            out.write(json.dumps(record) + '\n')
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""
+This module measures how the scheduler scales: it solves generated instances
+(fuzzyGenerate.generate()) of a sweep of sizes and records, for every size and
+seed, the wall time, the nodes expanded, the peak memory and the cost of the
+schedule found. The results can be stored as a baseline, and a later run
+compared with it, so a change is judged by numbers rather than by feel.
+
+Usage:
+
+python fuzzyBenchmark.py --repeat 3 --baseline benchmark_baseline.json
+python fuzzyBenchmark.py --sizes 10 50 100 500 --seeds 3 --save-baseline base.json
+python fuzzyBenchmark.py --sizes 10 50 100 500 --seeds 3 --baseline base.json
+python fuzzyBenchmark.py --sizes 50 150 --resources 5 --time-limit 20
+
+The last sweep puts every task on one resource of capacity 5, the case the
+propagation of cspResource.Cumulative must scale to.
+
+Every run is one instance solved in a new worker process, so that its peak
+memory (the maximum resident set size of the process) is its own; the time is
+that of parsing, building and searching, not of generating. With --repeat
+the time of a run is the least of its repeats, the usual way to filter out
+the noise of other processes. A run that reaches --time-limit reports the
+best schedule found so far.
+
+benchmark_baseline.json, next to this module, is the default sweep (the
+first command) as run when it was last updated. Its times are those of the
+machine it was made on: before judging a change by them on another machine,
+make a baseline there from the unchanged tree with --save-baseline. Without
+--baseline nothing is compared and the run says so; a --baseline file that
+does not exist is an error.
+
+A comparison prints, for every size, the times, nodes, memory and costs of
+both runs; it is a regression, and the exit status is 1, if a cost is higher,
+a solved instance is no longer solved, or the total time of a size grew by
+more than --tolerance (and 0.05 seconds). Nodes and memory are printed but
+not judged.
+
+Functions:
+
+run_instance() -- solve one generated instance in a worker, returning its record
+run_benchmark() -- solve every size and seed of a sweep, yielding records in order
+summarize() -- the totals of the records of every size
+compare() -- the lines of a comparison with a baseline and whether it regressed
+main() -- the command line
+"""
+import argparse
+import json
+import resource
+import sys
+import time
+from multiprocessing import Pool
+from fuzzyGenerate import generate, default_density
+from fuzzyScheduler import parse, solve_anytime, searchers
+
+# solve one generated instance; runs in a worker process
+def run_instance(tasks, seed, shape, searcher='greedy', seconds=None):
+    """returns the record of the instance generate(tasks, seed, **shape)
+    solved with searchers[searcher] within seconds (None for no limit)"""
+    lines = generate(tasks, seed, **shape)
+    start = time.perf_counter()
+    problem = parse(lines)
+    path, search = solve_anytime(problem, searcher, seconds=seconds)
+    elapsed = time.perf_counter() - start
+    if path is None:
+        status, cost = 'no solution', None
+    else:
+        status, cost = 'solved', search.problem.heuristic(path.end())
+    if search.exhausted:
+        status = 'time limit' if path is None else 'solved, time limit'
+    return {'tasks': tasks, 'seed': seed, 'status': status, 'cost': cost, 'time': elapsed,
+            'nodes_expanded': search.num_expanded,
+            'peak_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+
+def run_instance_args(args):
+    return run_instance(*args)
+
+# solve every size and seed of a sweep
+def run_benchmark(sizes, seeds, shape={}, searcher='greedy', seconds=None, repeat=1, workers=1):
+    """yields the record of every size of sizes and seed of seeds, in order.
+    The record of repeated runs has the least of their times and the most of
+    their peak memory. workers is the number of runs at a time; more than one
+    is quicker but makes the times noisier.
+    """
+    if searcher == 'parallel':
+        # the parallel searcher starts processes of its own, which pool workers may not
+        raise ValueError("the parallel searcher cannot run in a pool worker")
+    with Pool(workers, maxtasksperchild=1) as pool:
+        jobs = [(tasks, seed, shape, searcher, seconds)
+                for tasks in sizes for seed in seeds for _ in range(repeat)]
+        records = pool.imap(run_instance_args, jobs)
+        for _ in range(len(jobs) // repeat):
+            runs = [next(records) for _ in range(repeat)]
+            record = min(runs, key=lambda record: record['time'])
+            record['peak_kb'] = max(run['peak_kb'] for run in runs)
+            yield record
+
+# the totals of the records of every size
+def summarize(records):
+    """returns a tasks:summary dictionary, where a summary has the number of
+    runs, how many of them were solved, and the totals of their time, nodes
+    expanded and cost, and the most peak memory of any of them"""
+    sizes = {}
+    for record in records:
+        summary = sizes.setdefault(record['tasks'], {'runs': 0, 'solved': 0, 'time': 0.0,
+                                                     'nodes_expanded': 0, 'peak_kb': 0, 'cost': 0})
+        summary['runs'] += 1
+        summary['time'] += record['time']
+        summary['nodes_expanded'] += record['nodes_expanded']
+        summary['peak_kb'] = max(summary['peak_kb'], record['peak_kb'])
+        if record['cost'] is not None:
+            summary['solved'] += 1
+            summary['cost'] += record['cost']
+    return sizes
+
+# compare the records of a run with those of a baseline
+def compare(records, baseline, tolerance=0.2, slack=0.05):
+    """returns (lines, regressed) where lines describe every size of records
+    next to the same size of baseline (both lists of records), and regressed
+    is True if a cost is higher, a solved instance is not solved any more, or
+    the time of a size grew by more than the fraction tolerance and slack
+    seconds, so that sizes solved in milliseconds are not judged by noise"""
+    lines = []
+    regressed = False
+    before = {(record['tasks'], record['seed']): record for record in baseline}
+    for record in records:
+        old = before.get((record['tasks'], record['seed']))
+        if old is None:
+            continue
+        if old['cost'] is not None and (record['cost'] is None or record['cost'] > old['cost']):
+            lines.append(f"REGRESSION {record['tasks']} tasks seed {record['seed']}: "
+                         f"cost {old['cost']} -> {record['cost']} ({record['status']})")
+            regressed = True
+    old_sizes = summarize(record for record in baseline
+                          if (record['tasks'], record['seed']) in
+                          {(new['tasks'], new['seed']) for new in records})
+    for tasks, summary in summarize(records).items():
+        old = old_sizes.get(tasks)
+        if old is None:
+            lines.append(f"{tasks:>7} tasks: not in the baseline")
+            continue
+        ratio = summary['time'] / old['time'] if old['time'] else float('inf')
+        slower = summary['time'] > old['time'] * (1 + tolerance) + slack
+        regressed = regressed or slower
+        lines.append(f"{tasks:>7} tasks: time {old['time']:.3f}s -> {summary['time']:.3f}s "
+                     f"(x{ratio:.2f}{', REGRESSION' if slower else ''}), "
+                     f"nodes {old['nodes_expanded']} -> {summary['nodes_expanded']}, "
+                     f"peak {old['peak_kb']} -> {summary['peak_kb']} KB, "
+                     f"cost {old['cost']} -> {summary['cost']}, "
+                     f"solved {old['solved']} -> {summary['solved']} of {summary['runs']}")
+    return lines, regressed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scheduler on generated instances")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 20, 50, 100, 200],
+                        help="the numbers of tasks (default: 10 20 50 100 200)")
+    parser.add_argument('--seeds', type=int, default=3, help="instances per size (default: 3)")
+    parser.add_argument('--searcher', default='greedy',
+                        choices=sorted(name for name in searchers if name != 'parallel'))
+    parser.add_argument('--time-limit', type=float, default=60, metavar='SECONDS',
+                        help="seconds per instance (default: 60)")
+    parser.add_argument('--repeat', type=int, default=1, help="runs per instance (default: 1)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="runs at a time (default: 1, the least noisy)")
+    for relation, per_task in default_density.items():
+        parser.add_argument('--' + relation, type=float, default=per_task, metavar='D',
+                            help=f"{relation} constraints per task (default: {per_task})")
+    parser.add_argument('--unary', type=float, default=0.2)
+    parser.add_argument('--deadlines', type=float, default=0.5)
+    parser.add_argument('--resources', type=int, nargs='+', default=[], metavar='CAPACITY',
+                        help="the capacities of resources the tasks are shared among (default: none)")
+    parser.add_argument('--baseline', default=None, help="the JSON file of a run to compare with")
+    parser.add_argument('--save-baseline', default=None, help="the JSON file to store this run in")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="the fraction a size may get slower by (default: 0.2)")
+    args = parser.parse_args(argv)
+    shape = {'density': {relation: getattr(args, relation.replace('-', '_'))
+                         for relation in default_density},
+             'unary': args.unary, 'deadlines': args.deadlines, 'resources': args.resources}
+    settings = {'searcher': args.searcher, 'time_limit': args.time_limit, 'shape': shape}
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, 'r') as file:
+                baseline = json.load(file)
+        except FileNotFoundError:
+            parser.error(f"no baseline file {args.baseline!r}; make one with --save-baseline {args.baseline}")
+        if baseline['settings'] != settings:
+            print(f"the baseline was run with other settings: {baseline['settings']}", file=sys.stderr)
+    records = []
+    for record in run_benchmark(args.sizes, range(args.seeds), shape, args.searcher,
+                                args.time_limit, args.repeat, args.workers):
+        print(json.dumps(record), flush=True)
+        records.append(record)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as file:
+            json.dump({'settings': settings, 'records': records}, file, indent=1)
+    if baseline is None:
+        print("no baseline to compare with (--baseline FILE)", file=sys.stderr)
+    else:
+        lines, regressed = compare(records, baseline['records'], args.tolerance)
+        for line in lines:
+            print(line)
+        if regressed:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+This module provides the calendar of a fuzzy scheduling instance: its working
+days, its working hours and the length of a slot, the unit every start, end
+and duration is a whole number of.
+
+The default calendar is the one of the assignment: mon to fri, 9am to 5pm,
+one hour slots, one week. An instance can choose another one with a first
+line such as
+
+calendar, mon-fri 9am-5pm 15 2
+
+for 15 minute slots over two weeks. The days of the weeks after the first
+are labelled with their week, e.g. 'mon2', 'fri2'; a time with minutes is
+written '9:15am'.
+
+A time of the calendar is coded as one integer,
+
+    day number * day_stride + time number
+
+where the day number counts the days of the calendar from 1 for its first
+day (with the days that are not working days skipped, so that 'mon2' is day
+8) and the time number counts the slots of the working day from 1 for its
+start, so that mon 9am is 101 and mon 5pm is 109 by default. Starts and ends
+of the same day compare in time order, and so do different days.
+
+Static Objects:
+
+week -- the labels of the days of a week, in order
+day_stride -- the factor of the day number in the code of a time
+slot_spaces -- Store the Slot_space shared by the tasks of the same calendar and length
+
+Object Class:
+
+Calendar -- the days, the times and the task domains of an instance
+
+Functions:
+
+parse_minutes() -- the minutes after midnight of a time label, e.g. '9:15am'
+time_label() -- the time label of the minutes after midnight
+"""
+import re
+from bisect import bisect_left
+from intervalDomain import Interval_domain
+from slotDomain import Slot_space
+
+week = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+day_stride = 100
+slot_spaces = {}
+
+class Calendar(object):
+    """A Calendar consists of
+    * days, a day label:day number dictionary
+    * times, a time label:time number dictionary, one per slot boundary of a
+      working day, from its start (1) to its end
+    * slot_minutes, the length of a slot
+    * key, the tuple of the arguments, which equal calendars share
+    A task of a length of n slots gets a Slot_domain of all its (start, end)
+    values if they are at most max_slot_values, and an Interval_domain of its
+    starts otherwise.
+    """
+    max_slot_values = 1024
+
+    def __init__(self, first_day='mon', last_day='fri', start='9am', end='5pm',
+                 slot_minutes=60, weeks=1):
+        first, last = week.index(first_day), week.index(last_day)
+        start_minutes, end_minutes = parse_minutes(start), parse_minutes(end)
+        if last < first or end_minutes <= start_minutes or weeks < 1:
+            raise ValueError(f"empty calendar {first_day}-{last_day} {start}-{end} x {weeks}")
+        if slot_minutes <= 0 or (end_minutes - start_minutes) % slot_minutes:
+            raise ValueError(f"{start}-{end} is not a whole number of {slot_minutes} minute slots")
+        self.key = (first_day, last_day, start, end, slot_minutes, weeks)
+        self.slot_minutes = slot_minutes
+        self.start_minutes = start_minutes
+        self.points = (end_minutes - start_minutes) // slot_minutes + 1
+        if self.points >= day_stride:
+            raise ValueError(f"more than {day_stride - 2} slots in a day")
+        self.days = {}
+        for number in range(weeks):
+            suffix = str(number + 1) if number else ''
+            for day in range(first, last + 1):
+                self.days[week[day] + suffix] = number * 7 + day - first + 1
+        self.times = {time_label(start_minutes + point * slot_minutes): point + 1
+                      for point in range(self.points)}
+        self.day_labels = {number: day for day, number in self.days.items()}
+        self.day_numbers = sorted(self.day_labels)
+        self.time_labels = {number: time for time, number in self.times.items()}
+
+    def __repr__(self):
+        return "Calendar" + str(self.key)
+
+    def code(self, day, time):
+        """returns the code of time (a time label) on day (a day label)"""
+        return self.days[day] * day_stride + self.times[time]
+
+    def label(self, code):
+        """returns the 'day time' label of the code of a time, e.g. 'mon 9am'"""
+        return f'{self.day_labels[code // day_stride]} {self.time_labels[code % day_stride]}'
+
+    def slots(self, hours):
+        """returns the number of slots of a duration of hours (a number or a string)"""
+        minutes = float(hours) * 60
+        if minutes % self.slot_minutes:
+            raise ValueError(f"{hours} hours is not a whole number of {self.slot_minutes} minute slots")
+        return int(minutes // self.slot_minutes)
+
+    def lateness(self, end, deadline):
+        """returns the hours from the time deadline to the later time end,
+        counting 24 hours for every day"""
+        minutes = ((end // day_stride - deadline // day_stride) * 24 * 60
+                   + (end % day_stride - deadline % day_stride) * self.slot_minutes)
+        return minutes // 60 if minutes % 60 == 0 else minutes / 60
+
+    def working_time(self, low, high):
+        """returns the number of working slots from the time low to the time high"""
+        return self.slots_before(high) - self.slots_before(low)
+
+    def slots_before(self, code):
+        """returns the number of working slots of the calendar before the time code"""
+        day, time = divmod(code, day_stride)
+        before = bisect_left(self.day_numbers, day) * (self.points - 1)
+        if day in self.day_labels:
+            before += min(max(time - 1, 0), self.points - 1)
+        return before
+
+    def task_domain(self, length):
+        """returns the domain of all the (start, end) values of a task of length slots"""
+        starts = [(day * day_stride + 1, day * day_stride + self.points - length)
+                  for day in sorted(self.day_labels) if length < self.points]
+        if len(starts) * (self.points - length) > self.max_slot_values:
+            return Interval_domain(starts, length)
+        if (self.key, length) not in slot_spaces:
+            slot_spaces[(self.key, length)] = Slot_space(
+                (start, start + length) for first, last in starts for start in range(first, last + 1))
+        return slot_spaces[(self.key, length)].domain()
+
+# the minutes after midnight of a time label such as '9am', '12pm' or '9:15am'
+def parse_minutes(label):
+    match = re.fullmatch(r'(\d{1,2})(?::(\d\d))?(am|pm)', label)
+    if match is None or not 1 <= int(match.group(1)) <= 12:
+        raise ValueError(f"bad time {label!r}")
+    hour = int(match.group(1)) % 12 + (12 if match.group(3) == 'pm' else 0)
+    return hour * 60 + int(match.group(2) or 0)
+
+# the time label of the minutes after midnight, the inverse of parse_minutes()
+def time_label(minutes):
+    hour, minute = divmod(minutes % (24 * 60), 60)
+    label = str(hour % 12 or 12)
+    if minute:
+        label += f':{minute:02d}'
+    return label + ('am' if hour < 12 else 'pm')
@@ -0,0 +1,159 @@
+"""
+This module solves the independent parts of a fuzzy scheduling instance
+separately. Two tasks are in the same part (a connected component of the
+primal graph) if a chain of binary constraints links them; the soft cost of
+a schedule is the sum of the costs of its tasks, so the best schedule of the
+instance is the union of the best schedules of its parts.
+
+Splitting the whole instance searches the product of the parts; solving the
+parts one at a time searches their sum. The parts are solved in a pool of
+worker processes when there is more than one.
+
+Usage:
+
+python fuzzyComponents.py input.txt [greedy|bnb|parallel] --workers 4
+python fuzzyScheduler.py input.txt bnb --components --workers 4
+
+fuzzyScheduler's solve(), run_searcher() and solve_anytime() run a
+Component_searcher when they are given components=True.
+
+Object Class:
+
+Component_searcher -- a searcher that solves each component of a search problem on its own
+
+Functions:
+
+components() -- the sets of tasks of the connected components of a Soft_CSP
+connected() -- the tasks connected to some tasks, i.e. the union of their components
+component_csp() -- the Soft_CSP of the tasks of one component
+solve_component() -- search one component, in a worker process or not
+main() -- the command line
+"""
+import argparse
+import multiprocessing
+from fuzzyScheduler import (parse, output_display, Soft_CSP, Search_with_AC_from_Cost_CSP,
+                            Cost_node, searchers)
+from searchGeneric import Searcher
+from searchProblem import Path
+
+class Component_searcher(Searcher):
+    """returns a searcher that solves every component of problem separately.
+    * problem is a Search_with_AC_from_Cost_CSP; its components are searched
+      with the same strategy
+    * searcher is the name of the searcher of each component, one of searchers
+    * workers is the number of processes (None for one per core, 1 for none)
+    * kwargs go to the searcher of each component; a budget in kwargs is
+      started first, so that its time limit is one deadline for all of them
+    After search(), num_expanded is the total over the components, optimal
+    is True if the searcher proved every component optimal and exhausted is
+    True if the budget ran out in one of them.
+    """
+    def __init__(self, problem, searcher='greedy', workers=None, **kwargs):
+        super().__init__(problem, budget=kwargs.get('budget'))
+        self.searcher = searcher
+        self.workers = workers or multiprocessing.cpu_count()
+        self.kwargs = kwargs
+        self.optimal = False
+
+    def search(self):
+        """returns a path (of just the merged goal node) or None if a component has no schedule"""
+        csp = self.problem.cons.csp
+        if self.kwargs.get('budget') is not None:
+            self.kwargs['budget'].start()
+        parts = sorted(components(csp), key=len, reverse=True)   # the largest first
+        jobs = [(component_csp(csp, tasks), self.searcher, self.problem.strategy, self.kwargs)
+                for tasks in parts]
+        self.display(2, "Components:", parts)
+        # the parallel searcher starts processes of its own, which pool workers may not
+        if len(jobs) > 1 and self.workers > 1 and self.searcher != 'parallel':
+            with multiprocessing.Pool(min(self.workers, len(jobs))) as pool:
+                results = pool.map(solve_component_args, jobs)
+        else:
+            results = [solve_component(*job) for job in jobs]
+        self.num_expanded = sum(expanded for (_, _, expanded, _, _) in results)
+        self.exhausted = any(exhausted for (_, _, _, _, exhausted) in results)
+        self.display(1, "Number of nodes expanded:", self.num_expanded)
+        if any(node is None for (node, _, _, _, _) in results):
+            self.solution = None
+            return None
+        merged = {}
+        for node, _, _, _, _ in results:
+            merged.update(node)
+        goal = Cost_node((task, merged[task]) for task in csp.domains)
+        goal.bound = sum(cost for (_, cost, _, _, _) in results)
+        self.optimal = all(optimal for (_, _, _, optimal, _) in results)
+        self.solution = Path(goal)
+        return self.solution
+
+# the connected components of the primal graph of a Soft_CSP
+def components(csp):
+    """returns a list of the sets of tasks of the connected components of csp,
+    where two tasks are adjacent if a constraint has both in its scope
+    """
+    seen = set()
+    parts = []
+    for start in sorted(csp.variables):
+        if start not in seen:
+            part = connected(csp, [start])
+            seen |= part
+            parts.append(part)
+    return parts
+
+# the tasks connected to some tasks in the primal graph of a Soft_CSP
+def connected(csp, tasks):
+    """returns the set of the tasks of csp linked to one of tasks by a chain of
+    constraints, tasks included; it is the union of their components
+    """
+    part = {task for task in tasks if task in csp.variables}
+    to_visit = list(part)
+    while to_visit:
+        task = to_visit.pop()
+        for con in csp.var_to_const[task]:
+            for other in con.scope:
+                if other not in part:
+                    part.add(other)
+                    to_visit.append(other)
+    return part
+
+# the Soft_CSP of the tasks of one component, with every constraint on one of them
+def component_csp(csp, tasks):
+    return Soft_CSP({task: dom for task, dom in csp.domains.items() if task in tasks},
+                    [con for con in csp.constraints if any(var in tasks for var in con.scope)],
+                    {task: deadline for task, deadline in csp.soft_constraints.items() if task in tasks},
+                    {task: cost for task, cost in csp.soft_constraints_cost.items() if task in tasks},
+                    csp.calendar)
+
+# search one component; runs in a worker process when there are several
+def solve_component(csp, searcher, strategy, kwargs):
+    """returns (node, cost, nodes expanded, optimal, exhausted) for csp
+    searched with searchers[searcher]; node is the task:domain dict of the
+    schedule found, or None if there is none.
+    """
+    search_problem = Search_with_AC_from_Cost_CSP(csp, **strategy)
+    search = searchers[searcher](search_problem, **kwargs)
+    path = search.search()
+    optimal = getattr(search, 'optimal', False)
+    if path is None:
+        return None, None, search.num_expanded, optimal, search.exhausted
+    return (dict(path.end()), search_problem.heuristic(path.end()), search.num_expanded, optimal,
+            search.exhausted)
+
+def solve_component_args(args):
+    return solve_component(*args)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve the independent parts of a fuzzy scheduling instance separately")
+    parser.add_argument('filename', help="the input*.txt file of the instance")
+    parser.add_argument('searcher', nargs='?', default='greedy', choices=sorted(searchers),
+                        help="the searcher of each part: greedy (default), bnb or parallel")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of worker processes (default: one per core)")
+    args = parser.parse_args(argv)
+    with open(args.filename, 'r') as file:
+        problem = parse(file)
+    search_problem = Search_with_AC_from_Cost_CSP(problem.soft_csp())
+    searcher = Component_searcher(search_problem, args.searcher, args.workers)
+    output_display(searcher.search(), search_problem)
+
+if __name__ == '__main__':
+    main()
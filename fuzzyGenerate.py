@@ -0,0 +1,215 @@
+"""
+This module generates synthetic fuzzy scheduling instances in the input
+format, for benchmarks and for finding regressions on instances far larger
+than the input*.txt files.
+
+An instance is generated around a hidden schedule: every task is first given
+a random start, and only hard constraints that this schedule satisfies are
+written, so a generated instance always has a solution. Its soft deadlines
+are random and can be missed by any schedule.
+
+The shape of an instance is set by
+* tasks, the number of tasks
+* durations, an hours:weight dictionary of the duration mix
+* density, a relation:constraints per task dictionary of the binary
+  constraints of each relation ('before', 'after', 'same-day', 'starts-at')
+* unary, the probability that a task gets a domain constraint
+* deadlines, the probability that a task gets a soft deadline
+* max_cost, the highest cost per hour late of a deadline
+* resources, the capacities of the resources; every task uses one of them,
+  chosen at random, and the hidden schedule keeps within their capacities
+* calendar, the fuzzyCalendar.Calendar of the instance (one working week of
+  one hour slots by default)
+
+Usage:
+
+python fuzzyGenerate.py 500 --seed 3 --before 0.5 --same-day 0.2 -o big.txt
+python fuzzyGenerate.py 50 --seed 1 --resources 5 -o one_resource.txt
+
+Static Objects:
+
+default_durations -- Store the default duration mix, mostly short tasks
+default_density -- Store the default binary constraints per task of each relation
+
+Functions:
+
+generate() -- the lines of a random instance with a hidden schedule
+hidden_schedule() -- a random (start, end) value of every task, within the capacities of the resources
+binary_lines() -- the binary constraints of one relation that the hidden schedule satisfies
+unary_line() -- a random domain constraint a hidden value satisfies
+main() -- the command line
+"""
+import argparse
+import random
+import sys
+from fuzzyCalendar import Calendar, day_stride
+
+default_durations = {1: 4, 2: 3, 3: 2, 4: 1}
+default_density = {'before': 0.3, 'after': 0.1, 'same-day': 0.1, 'starts-at': 0.05}
+
+# the lines of a random instance with a hidden schedule
+def generate(tasks, seed=None, durations=default_durations, density=default_density,
+             unary=0.2, deadlines=0.5, max_cost=50, calendar=None, resources=()):
+    """returns the list of the lines of an instance of tasks tasks named t0,
+    t1, ...; the other arguments are described in the module docstring.
+    The same arguments and seed give the same instance.
+    """
+    rng = random.Random(seed)
+    calendar = calendar or Calendar()
+    lengths = {f't{i}': rng.choices(list(durations), list(durations.values()))[0]
+               for i in range(tasks)}
+    users = {task: rng.randrange(len(resources)) for task in lengths} if resources else {}
+    values = hidden_schedule(calendar, lengths, rng, users, resources)
+    lines = [f'# {tasks} tasks generated by fuzzyGenerate.py, seed {seed}']
+    if calendar.key != Calendar().key:
+        first_day, last_day, start, end, slot_minutes, weeks = calendar.key
+        lines.append(f'calendar, {first_day}-{last_day} {start}-{end} {slot_minutes} {weeks}')
+    lines.extend(f'task, {task} {hours}' for task, hours in lengths.items())
+    for number, capacity in enumerate(resources):
+        members = [task for task in lengths if users[task] == number]
+        if members:
+            lines.append(f'resource, r{number} {capacity} ' + ' '.join(members))
+    for relation, per_task in density.items():
+        lines.extend(binary_lines(relation, round(per_task * tasks), values, rng))
+    for task, value in values.items():
+        if rng.random() < unary:
+            lines.append(unary_line(calendar, task, value, rng))
+    for task in values:
+        if rng.random() < deadlines:
+            day = rng.choice(list(calendar.days))
+            time = rng.choice(list(calendar.times)[1:])
+            lines.append(f'domain, {task} ends-by {day} {time} {rng.randint(1, max_cost)}')
+    return lines
+
+# a random (start, end) value of every task
+def hidden_schedule(calendar, lengths, rng, users={}, capacities=(), tries=1000):
+    """returns a task:(start, end) dictionary of codes of calendar, every task
+    of lengths (a task:hours dictionary) starting and ending on the same day.
+    A task of users (a task:resource number dictionary) gets a start where its
+    resource has a free unit of capacities[resource] all along; it is given
+    up with a ValueError after tries starts that do not."""
+    values = {}
+    used = {}           # (resource, time):tasks using resource at time
+    for task, hours in lengths.items():
+        length = calendar.slots(hours)
+        if length >= calendar.points:
+            raise ValueError(f"a task of {hours} hours does not fit in a day of {calendar}")
+        resource = users.get(task)
+        for _ in range(tries):
+            start = rng.choice(list(calendar.day_labels)) * day_stride + rng.randint(1, calendar.points - length)
+            if resource is None or all(used.get((resource, time), 0) < capacities[resource]
+                                       for time in range(start, start + length)):
+                break
+        else:
+            raise ValueError(f"resource r{resource} is too full for a task of {hours} hours")
+        if resource is not None:
+            for time in range(start, start + length):
+                used[(resource, time)] = used.get((resource, time), 0) + 1
+        values[task] = (start, start + length)
+    return values
+
+# the binary constraints of one relation that the hidden schedule satisfies
+def binary_lines(relation, count, values, rng, tries=20):
+    """returns up to count different 'constraint' lines of relation between
+    random tasks whose values satisfy it; a constraint is given up after tries
+    pairs that do not"""
+    tasks = list(values)
+    by_start, by_day = {}, {}
+    for task, (start, end) in values.items():
+        by_start.setdefault(start, []).append(task)
+        by_day.setdefault(start // day_stride, []).append(task)
+    lines, seen = [], set()
+    if len(tasks) < 2:
+        return lines
+    for _ in range(count):
+        for _ in range(tries):
+            one, two = rng.sample(tasks, 2)
+            if relation == 'starts-at':
+                # one starts when two ends
+                candidates = by_start.get(values[two][1], ())
+                one = rng.choice(candidates) if candidates else None
+            elif relation == 'same-day':
+                two = rng.choice(by_day[values[one][0] // day_stride])
+            elif values[one][0] < values[two][0]:
+                one, two = two, one         # one is the later task
+            if (one is None or one == two
+                    or relation in ('before', 'after') and values[two][1] > values[one][0]):
+                continue
+            line = (f'constraint, {two} before {one}' if relation == 'before'
+                    else f'constraint, {one} {relation} {two}')
+            if line not in seen:
+                seen.add(line)
+                lines.append(line)
+                break
+    return lines
+
+# a random domain constraint that a hidden value satisfies
+def unary_line(calendar, task, value, rng):
+    """returns a 'domain' line of task that value, its (start, end) codes
+    of calendar, satisfies"""
+    start, end = value
+    day = calendar.day_labels[start // day_stride]
+    days = sorted(calendar.day_labels)
+    label = calendar.time_labels
+    kind = rng.choice(('day', 'time', 'starts-before', 'starts-after', 'ends-before',
+                       'ends-after', 'starts-in', 'ends-in'))
+    if kind == 'day':
+        return f'domain, {task} {day}'
+    if kind == 'time':
+        return f'domain, {task} {label[start % day_stride]}'
+    if kind == 'starts-in' or kind == 'ends-in':
+        field = start if kind == 'starts-in' else end
+        first = rng.choice([number for number in days if number <= field // day_stride])
+        last = rng.choice([number for number in days if number >= field // day_stride])
+        low = rng.randint(1, field % day_stride) if first == field // day_stride else 1
+        high = (rng.randint(field % day_stride, calendar.points)
+                if last == field // day_stride else calendar.points)
+        return (f'domain, {task} {kind} {calendar.day_labels[first]} {label[low]}'
+                f'-{calendar.day_labels[last]} {label[high]}')
+    field = start if kind.startswith('starts') else end
+    if kind.endswith('before'):
+        time = rng.randint(field % day_stride, calendar.points)
+    else:
+        time = rng.randint(1, field % day_stride)
+    if rng.random() < 0.5:
+        return f'domain, {task} {kind} {label[time]}'
+    return f'domain, {task} {kind} {day} {label[time]}'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a fuzzy scheduling instance with a solution")
+    parser.add_argument('tasks', type=int, help="the number of tasks")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--durations', default=None, metavar='H:W,...',
+                        help="the duration mix as hours:weight pairs (default: 1:4,2:3,3:2,4:1)")
+    for relation, per_task in default_density.items():
+        parser.add_argument('--' + relation, type=float, default=per_task, metavar='D',
+                            help=f"{relation} constraints per task (default: {per_task})")
+    parser.add_argument('--unary', type=float, default=0.2,
+                        help="the probability of a domain constraint per task (default: 0.2)")
+    parser.add_argument('--deadlines', type=float, default=0.5,
+                        help="the probability of a soft deadline per task (default: 0.5)")
+    parser.add_argument('--max-cost', type=int, default=50,
+                        help="the highest cost per hour late (default: 50)")
+    parser.add_argument('--resources', type=int, nargs='+', default=(), metavar='CAPACITY',
+                        help="the capacities of resources the tasks are shared among (default: none)")
+    parser.add_argument('-o', '--output', default=None,
+                        help="the file to write (default: standard output)")
+    args = parser.parse_args(argv)
+    durations = default_durations
+    if args.durations:
+        durations = {}
+        for pair in args.durations.split(','):
+            hours, weight = pair.split(':')
+            durations[float(hours) if '.' in hours else int(hours)] = float(weight)
+    density = {relation: getattr(args, relation.replace('-', '_')) for relation in default_density}
+    lines = generate(args.tasks, args.seed, durations, density, args.unary,
+                     args.deadlines, args.max_cost, resources=args.resources)
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        out.write('\n'.join(lines) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == '__main__':
+    main()
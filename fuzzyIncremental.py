@@ -0,0 +1,248 @@
+"""
+This module keeps a fuzzy scheduling instance solved while it is edited, a
+few tasks, constraints or deadlines at a time, instead of parsing and solving
+the whole instance again after every change.
+
+The arc consistent domains of the instance (the start node of its
+Search_with_AC_from_Cost_CSP) are kept up to date by every edit:
+
+* adding a task adds its full domain, which nothing constrains yet; a task
+  that already exists is refused
+* adding a constraint only tightens domains, so it is propagated from the
+  current domains, starting with the arcs of the new constraint
+* removing a constraint or a task can loosen the domains of the tasks
+  connected to it, and only of those: their domains are reset to the ones
+  their unary constraints allow and propagated again. A global constraint
+  on a removed task (the Cumulative of a resource) is kept over the rest of
+  its tasks
+* a deadline only changes the soft cost bound of the start node
+
+What the solver learned about a removed constraint (its support tables and
+its dom/wdeg weight) is dropped with it, so a long editing session does not
+keep it.
+
+solve() starts from the last schedule: the tasks that can keep their starts
+are given them and propagated, and the search only has to place the rest.
+The cost of that schedule is then the initial bound of a search from the
+domains, with every searcher, which keeps a cheaper schedule if it finds
+one: the result is no worse than a solve from scratch, and with 'bnb' (or
+'greedy', whose heuristic never overestimates) it is still optimal. If the
+last schedule does not fit the edited instance at all, the search starts
+from the domains alone.
+
+Object Class:
+
+Incremental_scheduler -- an instance kept arc consistent through edits, with warm started solves
+"""
+from cspConsistency import Domain_store, select
+from fuzzyScheduler import (parse, run_searcher, Search_with_AC_from_Cost_CSP, Cost_node,
+                            Constraint)
+from fuzzyComponents import connected
+
+class Incremental_scheduler(object):
+    """An Incremental_scheduler consists of
+    * problem, the Problem as edited so far; its hard_constraints include the unary ones
+    * searcher, the name of the searcher of solve(), one of searchers
+    * search_problem, the Search_with_AC_from_Cost_CSP whose domains (its start
+      node) are kept arc consistent with the edited problem
+    * schedule, the goal node of the last schedule found, or None
+    """
+    def __init__(self, problem, searcher='greedy', **strategy):
+        """problem is a Problem (e.g. returned by parse());
+        strategy is the keyword arguments of Search_with_AC_from_Cost_CSP"""
+        self.problem = problem
+        self.searcher = searcher
+        self.search_problem = Search_with_AC_from_Cost_CSP(problem.soft_csp(), **strategy)
+        self.csp = self.search_problem.cons.csp
+        self.schedule = None
+
+    def add(self, line):
+        """applies a line of the input format (a task, constraint, domain or
+        resource line) as the edits it stands for.
+        returns the list of the Constraints added, which remove_constraint() accepts
+        """
+        lines = parse([line], self.problem.calendar, self.problem.length_of_time)
+        for task, hours in lines.length_of_time.items():
+            self.add_task(task, hours)
+        for con in lines.hard_constraints:
+            self.add_constraint(con)
+        for task, deadline in lines.soft_constraints.items():
+            self.set_deadline(task, deadline, lines.soft_constraints_cost[task])
+        return lines.hard_constraints
+
+    def add_task(self, task, hours):
+        """adds task, lasting hours, with no constraint or deadline; task must be new"""
+        if task in self.problem.length_of_time:
+            raise ValueError(f"task {task!r} already exists")
+        calendar = self.problem.calendar
+        domain = calendar.task_domain(calendar.slots(hours))
+        self.problem.length_of_time[task] = hours
+        self.problem.task_basic_value[task] = domain
+        self.csp.add_variable(task, domain)
+        node = self.search_problem.domains.updated({task: domain})
+        node.bound = self.search_problem.domains.bound
+        self.update(node)
+
+    def remove_task(self, task):
+        """removes task with its constraints and deadline; a global constraint
+        on task (whose condition has a propagate method) is rebuilt over the
+        other tasks of its scope"""
+        neighbours = set()
+        for con in [con for con in self.problem.hard_constraints if task in con.scope]:
+            self.problem.hard_constraints.remove(con)
+            if len(con.scope) > 1:
+                self.csp.remove_constraint(con)
+                self.search_problem.cons.forget_constraint(con)
+                rest = tuple(var for var in con.scope if var != task)
+                neighbours.update(rest)
+                if hasattr(con.condition, 'propagate'):
+                    self.keep_constraint(Constraint(rest, con.condition))
+        self.search_problem.cons.index_constraints()
+        self.remove_deadline(task)
+        del self.problem.length_of_time[task]
+        del self.problem.task_basic_value[task]
+        self.csp.remove_variable(task)
+        node = Cost_node((var, dom) for var, dom in self.search_problem.domains.items() if var != task)
+        node.bound = self.search_problem.domains.bound
+        self.update(node)
+        self.relax(neighbours)
+
+    def keep_constraint(self, con):
+        """adds the hard Constraint con to the problem and the CSP without
+        propagating it; a unary con is folded into the domain of its task"""
+        self.problem.hard_constraints.append(con)
+        if len(con.scope) == 1:
+            task = con.scope[0]
+            self.csp.domains[task] = self.csp.domains[task].satisfying(con.condition)
+        else:
+            self.csp.add_constraint(con)
+
+    def add_constraint(self, con):
+        """adds the hard Constraint con, whose scope must be tasks of the problem"""
+        self.problem.hard_constraints.append(con)
+        node = self.search_problem.domains
+        cons = self.search_problem.cons
+        if len(con.scope) == 1:
+            task = con.scope[0]
+            self.csp.domains[task] = self.csp.domains[task].satisfying(con.condition)
+            self.propagate(node, cons.new_to_do(task, None), {task: node[task].satisfying(con.condition)})
+        else:
+            self.csp.add_constraint(con)
+            cons.index_constraints()
+            self.propagate(node, {(var, con) for var in con.scope})
+
+    def remove_constraint(self, con):
+        """removes the hard Constraint con"""
+        self.problem.hard_constraints.remove(con)
+        if len(con.scope) == 1:
+            task = con.scope[0]
+            domain = self.problem.task_basic_value[task]
+            for other in self.problem.hard_constraints:
+                if other.scope == (task,):
+                    domain = domain.satisfying(other.condition)
+            self.csp.domains[task] = domain
+        else:
+            self.csp.remove_constraint(con)
+            self.search_problem.cons.forget_constraint(con)
+            self.search_problem.cons.index_constraints()
+        self.relax(con.scope)
+
+    def set_deadline(self, task, deadline, cost):
+        """gives task the soft deadline (the code of a time of the calendar,
+        e.g. problem.calendar.code('mon', '3pm')) and cost per hour late"""
+        self.remove_deadline(task)
+        self.problem.soft_constraints[task] = deadline
+        self.problem.soft_constraints_cost[task] = cost
+        soft_bound = self.search_problem.soft_bound
+        soft_bound.set_deadline(task, deadline, cost)
+        node = Cost_node(self.search_problem.domains)
+        node.bound = self.search_problem.domains.bound + soft_bound.task_bound(task, node[task])
+        self.update(node)
+
+    def remove_deadline(self, task):
+        """removes the soft deadline of task, if it has one"""
+        soft_bound = self.search_problem.soft_bound
+        if task in soft_bound.deadlines:
+            node = Cost_node(self.search_problem.domains)
+            node.bound = self.search_problem.domains.bound - soft_bound.task_bound(task, node[task])
+            soft_bound.remove_deadline(task)
+            del self.problem.soft_constraints[task]
+            del self.problem.soft_constraints_cost[task]
+            self.update(node)
+
+    def relax(self, tasks):
+        """resets the domains of the tasks connected to tasks to the domains
+        their unary constraints allow, and makes them arc consistent again"""
+        part = connected(self.csp, tasks)
+        to_do = {(var, con) for task in part for con in self.csp.var_to_const[task]
+                 for var in con.scope}
+        self.propagate(self.search_problem.domains, to_do,
+                       {task: self.csp.domains[task] for task in part})
+
+    def propagate(self, node, to_do, assign={}):
+        """makes the start node the child of node where the variable:domain
+        dictionary assign is assigned and to_do propagated.
+        returns False if a domain became empty, otherwise True
+        """
+        store = Domain_store(node)
+        for var, dom in assign.items():
+            store.assign(var, dom)
+        consistent = self.search_problem.cons.propagate(store, to_do)
+        self.update(self.search_problem.child_node(node, store))
+        return consistent
+
+    def update(self, node):
+        """makes node the start node of the search problem"""
+        self.search_problem.domains = node
+        self.search_problem.variables = sorted(self.csp.variables, key=str)
+
+    def solve(self, **kwargs):
+        """returns (path, searcher) as fuzzyScheduler.solve() does, searching
+        from the last schedule first; kwargs go to the searcher
+        """
+        start = self.search_problem.domains
+        warm = self.warm_start(start)
+        path = None
+        if warm is not None:
+            path, searcher = self.search_from(warm, **kwargs)
+        if path is None:
+            path, searcher = self.search_from(start, **kwargs)
+        else:
+            # only a cheaper schedule than the warm one is searched for
+            cost = self.search_problem.heuristic(path.end())
+            better, searcher = self.search_from(start, bound=cost, **kwargs)
+            path = better or path
+        if path is not None:
+            self.schedule = path.end()
+        return path, searcher
+
+    def warm_start(self, start):
+        """returns the node below start where every task of the last schedule
+        whose start is still possible keeps it, or None if there is no last
+        schedule or that node has no solution"""
+        if self.schedule is None:
+            return None
+        assign = {}
+        for task, dom in self.schedule.items():
+            if task in start:
+                val = select(dom)
+                if val in start[task]:
+                    assign[task] = start[task].within(0, val[0], val[0])
+        if not assign:
+            return None
+        cons = self.search_problem.cons
+        store = Domain_store(start)
+        for task, dom in assign.items():
+            store.assign(task, dom)
+        if not cons.propagate(store, {arc for task in assign for arc in cons.new_to_do(task, None)}):
+            return None
+        return self.search_problem.child_node(start, store)
+
+    def search_from(self, node, **kwargs):
+        """returns run_searcher() on the search problem started at node"""
+        start = self.search_problem.domains
+        self.search_problem.domains = node
+        try:
+            return run_searcher(self.search_problem, self.searcher, **kwargs)
+        finally:
+            self.search_problem.domains = start
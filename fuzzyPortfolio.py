@@ -0,0 +1,168 @@
+"""
+This module races several search strategies on one fuzzy scheduling instance,
+each in its own process, so that the strategies that happen to be slow on an
+instance run on cores that would otherwise be idle.
+
+A strategy is a dict of the keyword arguments of Search_with_AC_from_CSP:
+var_order, split, value_order and seed.
+
+* With a satisfaction searcher (e.g. greedy) the first schedule found wins and
+  the other processes are stopped.
+* With 'bnb' every process runs DF_branch_and_bound against a bound shared by
+  all of them, so each one prunes with the best cost any of them has found.
+  The first process to finish proves that the best schedule found is optimal.
+
+Usage:
+
+python fuzzyPortfolio.py input.txt [greedy|bnb] --workers 4
+
+Static Objects:
+
+portfolio -- the strategies raced first; more get random seeds
+
+Object Class:
+
+Portfolio_branch_and_bound -- DF_branch_and_bound that reports every improvement
+
+Functions:
+
+strategies() -- the strategies for a given number of processes
+run_strategy() -- search with one strategy in a worker process
+portfolio_solve() -- race strategies on a Problem and return the result
+main() -- the command line
+"""
+import argparse
+import multiprocessing
+import queue
+from fuzzyScheduler import parse, Search_with_AC_from_Cost_CSP, schedule_of, searchers
+from searchBranchAndBound import DF_branch_and_bound
+
+portfolio = [{'var_order': 'first', 'split': 'halve', 'value_order': 'low'},
+             {'var_order': 'domwdeg', 'split': 'cheapest', 'value_order': 'cheapest'},
+             {'var_order': 'mrv', 'split': 'halve', 'value_order': 'cheapest'},
+             {'var_order': 'degree', 'split': 'first', 'value_order': 'low'},
+             {'var_order': 'random', 'split': 'halve', 'value_order': 'low', 'seed': 1},
+             {'var_order': 'first', 'split': 'halve', 'value_order': 'high'},
+             {'var_order': 'random', 'split': 'first', 'value_order': 'random', 'seed': 2},
+             {'var_order': 'random', 'split': 'halve', 'value_order': 'random', 'seed': 3}]
+
+# the strategies for a given number of processes
+def strategies(number):
+    chosen = [dict(strategy) for strategy in portfolio[:number]]
+    for seed in range(len(portfolio) + 1, len(portfolio) + 1 + number - len(chosen)):
+        chosen.append({'var_order': 'random', 'split': 'halve', 'value_order': 'random', 'seed': seed})
+    return chosen
+
+class Portfolio_branch_and_bound(DF_branch_and_bound):
+    """puts ('solution', index, cost, schedule, None) on results for every improvement"""
+    def __init__(self, problem, index, results, shared_bound):
+        super().__init__(problem, shared_bound=shared_bound)
+        self.index = index
+        self.results = results
+
+    def improved(self, path, value):
+        self.results.put(('solution', self.index, value,
+                          schedule_of(path.end(), self.problem.calendar), None))
+        super().improved(path, value)
+
+# search with one strategy; runs in a worker process
+def run_strategy(index, csp, searcher, strategy, shared_bound, results):
+    """searches csp with strategy and puts its messages on the queue results:
+    ('solution', index, cost, schedule, None) for each schedule found, then
+    ('done', index, None, None, nodes expanded) when the search is complete.
+    """
+    search_problem = Search_with_AC_from_Cost_CSP(csp, **strategy)
+    if searcher == 'bnb':
+        search = Portfolio_branch_and_bound(search_problem, index, results, shared_bound)
+        search.search()
+    else:
+        search = searchers[searcher](search_problem)
+        path = search.search()
+        if path is not None:
+            results.put(('solution', index, search_problem.heuristic(path.end()),
+                         schedule_of(path.end(), csp.calendar), search.num_expanded))
+    results.put(('done', index, None, None, search.num_expanded))
+
+# race strategies on a Problem
+def portfolio_solve(problem, searcher='greedy', workers=None, chosen=None):
+    """returns a dict with status ('solved' or 'no solution'), schedule, cost,
+    strategy (the one that found the schedule) and optimal (True when 'bnb'
+    proved the cost optimal).
+    workers is the number of processes (None for one per core); chosen is the
+    list of strategies to race (by default strategies(workers)).
+    Raises RuntimeError if the processes all ended, some of them failing,
+    before any schedule was found or any search finished; a schedule found
+    before they failed is returned, but not as optimal.
+    """
+    if searcher == 'parallel':
+        # the parallel searcher starts processes of its own, which the daemonic strategy processes may not
+        raise ValueError("the parallel searcher cannot run in a strategy process")
+    if chosen is None:
+        chosen = strategies(workers or multiprocessing.cpu_count())
+    csp = problem.soft_csp()
+    shared_bound = multiprocessing.Value('d', float('inf'))
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_strategy, daemon=True,
+                                         args=(index, csp, searcher, strategy, shared_bound, results))
+                 for index, strategy in enumerate(chosen)]
+    for process in processes:
+        process.start()
+    best = None
+    optimal = False
+    try:
+        while True:
+            try:
+                kind, index, cost, schedule, _ = results.get(timeout=0.1)
+            except queue.Empty:
+                if any(process.is_alive() for process in processes):
+                    continue
+                failed = [process.exitcode for process in processes if process.exitcode]
+                if failed and best is None:
+                    raise RuntimeError(f"{len(failed)} of {len(processes)} strategy processes "
+                                       f"failed, exit codes {failed}")
+                break
+            if kind == 'solution' and (best is None or cost < best[0]):
+                best = (cost, schedule, index)
+                if searcher != 'bnb':
+                    break
+            elif kind == 'done':
+                # a complete search: nothing is cheaper than the shared bound
+                optimal = searcher == 'bnb'
+                if best is None and shared_bound.value == float('inf'):
+                    break
+                if best is not None and best[0] <= shared_bound.value:
+                    break
+                # else the process that lowered the shared bound has yet to be heard from
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+    if best is None:
+        return {'status': 'no solution', 'schedule': None, 'cost': None,
+                'strategy': None, 'optimal': optimal}
+    cost, schedule, index = best
+    return {'status': 'solved', 'schedule': schedule, 'cost': cost,
+            'strategy': chosen[index], 'optimal': optimal}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Race search strategies on a fuzzy scheduling instance")
+    parser.add_argument('filename', help="the input*.txt file of the instance")
+    parser.add_argument('searcher', nargs='?', default='greedy',
+                        choices=sorted(name for name in searchers if name != 'parallel'),
+                        help="greedy (default) for the first schedule, bnb for a proven minimum cost one")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of strategies raced (default: one per core)")
+    args = parser.parse_args(argv)
+    with open(args.filename, 'r') as file:
+        problem = parse(file)
+    result = portfolio_solve(problem, args.searcher, args.workers)
+    if result['status'] == 'solved':
+        for task, start in result['schedule'].items():
+            print(f'{task}:{start}')
+        print(f"cost:{result['cost']}")
+    else:
+        print('No solution')
+
+if __name__ == '__main__':
+    main()
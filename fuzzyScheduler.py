@@ -15,20 +15,29 @@ Constraint -- Store all constraints i.e. binary_constraints, hard_constraints, s
 Soft_CSP -- Use CSP but add soft_constraints and soft_constraints_cost
 Search_with_AC_from_Cost_CSP -- inherit class Search_with_AC_from_CSP from cspConsistency.py which 
     add heuristic() function to calculation the Minimum soft constraints cost
-
-Dynamic objects:
-
-length_of_time -- a dict include tasks duration hours
-task_basic_value -- a dict tasks include start time and end time, and end time brfore 5pm 
-hard_constraints  -- a list include all hard constraints
-soft_constraints -- a dict include all tasks soft constraints
-soft_constraints_cost -- a dict include all tasks soft constraints cost
+Cost_node -- a search node, i.e. a task:domain Domain_map that carries its soft cost lower bound
+Soft_cost_bound -- per value soft cost tables, giving the bound of a node incrementally
+Problem -- a scheduling instance returned by parse(), which holds
+    length_of_time -- a dict include tasks duration hours
+    task_basic_value -- a dict tasks include start time and end time, and end time brfore 5pm,
+        each stored as a bitset Slot_domain (or an Interval_domain on a long calendar)
+    hard_constraints  -- a list include all hard constraints
+    soft_constraints -- a dict include all tasks soft constraints
+    soft_constraints_cost -- a dict include all tasks soft constraints cost
+    calendar -- the fuzzyCalendar.Calendar its days and times are read in
 
 Static Objects: 
 
-day_num -- Store the number of the week
-time_num -- Store the number of the time
-domain -- Store all the possibility domain，
+default_calendar -- Store the Calendar of an instance without a calendar line:
+    mon to fri, 9am to 5pm, one hour slots
+searchers -- Store the searchers that can be chosen on the command line:
+    'greedy' (default) is best-first on heuristic(), 'bnb' is depth-first branch
+    and bound that returns a minimum cost schedule, 'parallel' is branch and
+    bound shared across one worker process per core, 'local' improves a first
+    schedule by large neighbourhood search, for instances too big for the others
+line_parsers -- Store the function that reads each kind of input line, by its first word
+binary_conditions, daytime_constraints, time_constraints, range_constraints --
+    Store the constraint functions by their input keyword
 
 Functions:
 
@@ -37,6 +46,7 @@ binary_constraints_before() -- task1 ends when or before task2 starts
 binary_constraints_after() -- task1 starts after or when task2 ends
 binary_constraints_sameday() -- task1 and task2 are scheduled on the same day
 binary_constraints_startsat() -- task1 starts exactly when task2 ends
+supported_sameday(), supported_startsat() -- revise same-day and starts-at on the start intervals of the domains
 
 # hard constraint function
 hard_constraints_day() -- task starts on given day at any time
@@ -52,11 +62,36 @@ hard_constraints_endsbefore_time() -- task ends at or before time on any day
 hard_constraints_startsafter_time() -- task stats at or after time on any day
 hard_constraints_endsafter_time() -- task ends at or after time on any day
 
+soft_cost() -- the soft constraints cost of a task ending at a given time
+heuristic() -- the Minimum soft constraints cost of a node
+node_consistent() -- fold the unary hard constraints into the task domains
+parse() -- read an instance from any iterable of lines into a Problem
+solve() -- search a Problem for a schedule with one of the searchers
+run_searcher() -- search an already built Search_with_AC_from_Cost_CSP with one of the searchers
+make_searcher() -- one of the searchers, or a fuzzyComponents.Component_searcher running it on every component
+solve_anytime() -- search a Problem within a time or node budget, reporting every better schedule
+schedule_of() -- get the start of every task of a solved node, e.g. {'t1': 'mon 9am'}
+compare_strategies() -- the nodes expanded by every var order and value order
 output_display() -- Modify the standard display format like assignment requirement output
+print_stats() -- print the counters and timers of a search to stderr as JSON or Prometheus text
+print_visited() -- print the duplicates pruned and the states evicted by the visited table to stderr
+main() -- the command line: python fuzzyScheduler.py input.txt [greedy|bnb|parallel|local]
+
+Importing this module has no side effects; the command line runs main().
 """
+import argparse
 import sys
-from cspConsistency import Search_with_AC_from_CSP
-from searchGeneric import GreedySearcher
+from contextlib import nullcontext
+from cspConsistency import Search_with_AC_from_CSP, select, var_orders, splits, value_orders
+from cspResource import Cumulative
+from cspTemporal import start_offset
+from domainMap import Domain_map
+from searchGeneric import GreedySearcher, Visited_table, Budget
+from searchBranchAndBound import DF_branch_and_bound
+from searchParallel import Parallel_searcher
+from cspLocalSearch import Local_searcher
+from searchStats import Search_stats
+from fuzzyCalendar import Calendar, day_stride
 
 # Use AIpython code to Create Constraint class, in order to get right format combine all variables and conditions
 class Constraint(object):
@@ -83,16 +118,19 @@ class Constraint(object):
 class Soft_CSP(object):
     """The Soft_CSP consists of
     * domains, a dictionary that maps each variable to its domain
-    * constraints, a list of constraints
+    * constraints, a list of constraints, including the resource constraints
+      over all the tasks of a resource, which Con_solver propagates as a whole
     * variables, a set of variables
     * var_to_const, a variable to set of constraints dictionary
     * soft_constraints, a dictionary that store soft constraints
     * soft_constraints_cost, a dictionary that store store soft cost
+    * calendar, the Calendar the times are coded in
     """
-    def __init__(self, domains, constraints, soft_constraints, soft_constraints_cost):
+    def __init__(self, domains, constraints, soft_constraints, soft_constraints_cost, calendar=None):
         """domains is a variable:domain dictionary
         constraints is a list of constriants
         """
+        self.calendar = calendar or default_calendar
         self.variables = set(domains)
         self.domains = domains
         self.constraints = constraints
@@ -104,6 +142,30 @@ class Soft_CSP(object):
             for var in con.scope:
                 self.var_to_const[var].add(con)
 
+    def add_variable(self, var, domain):
+        """adds variable var with domain, in no constraint yet"""
+        self.variables.add(var)
+        self.domains[var] = domain
+        self.var_to_const[var] = set()
+
+    def remove_variable(self, var):
+        """removes variable var, which must be in no constraint any more"""
+        self.variables.discard(var)
+        del self.domains[var]
+        del self.var_to_const[var]
+
+    def add_constraint(self, con):
+        """adds constraint con over variables of the CSP"""
+        self.constraints.append(con)
+        for var in con.scope:
+            self.var_to_const[var].add(con)
+
+    def remove_constraint(self, con):
+        """removes constraint con"""
+        self.constraints.remove(con)
+        for var in con.scope:
+            self.var_to_const[var].discard(con)
+
     def __str__(self):
         """string representation of CSP"""
         return str(self.domains)
@@ -123,35 +185,123 @@ class Soft_CSP(object):
 
 # rewrite Search_with_AC_from_CSP in cspConsistency.py and add soft_constraints and soft_constraints_cost
 class Search_with_AC_from_Cost_CSP(Search_with_AC_from_CSP):
-    def __init__(self, csp):
-        super().__init__(csp)
+    """Splitting is free (split_cost is 0): the cost of a schedule is its soft
+    constraints cost, which heuristic() bounds from below and gives exactly
+    once every task has one value. A schedule is its goal node alone, so the
+    searchers keep no history (a path is its end node and cost only).
+    """
+    split_cost = 0
+    history = False
+
+    def __init__(self, csp, **strategy):
+        """strategy is the keyword arguments of Search_with_AC_from_CSP, e.g. var_order"""
+        super().__init__(csp, **strategy)
+        self.strategy = strategy
         self.cost = []
         self.soft_constraints = csp.soft_constraints
-        self.soft_constraints_cost = soft_constraints_cost
+        self.soft_constraints_cost = csp.soft_constraints_cost
+        self.calendar = csp.calendar
+        self.soft_bound = Soft_cost_bound(csp.soft_constraints, csp.soft_constraints_cost, csp.calendar)
+        self.domains = self.soft_bound.node(self.domains)
+
+    def heuristic(self, node):
+        if isinstance(node, Cost_node):
+            return node.bound
+        return heuristic(self, node)
+
+    def value_cost(self, var, val):
+        """the soft constraints cost of task var at val, for the cheapest orderings"""
+        return self.soft_bound.value_cost(var, val)
+
+    def domain_cost(self, var, dom):
+        """the cost of the value of dom that ends first, without enumerating dom"""
+        return self.soft_bound.task_bound(var, dom) if var in self.soft_bound.deadlines else 0
+
+    def child_node(self, node, domains):
+        """the bound of the child is updated for the tasks propagation changed only"""
+        child = node.updated(domains.changes)
+        child.bound = self.soft_bound.child_bound(node, child, domains.changes)
+        return child
+
+# a search node: a task:domain Domain_map that carries its soft cost lower bound
+class Cost_node(Domain_map):
+    __slots__ = ('bound',)
+
+# the soft constraints cost of the tasks with a deadline
+class Soft_cost_bound(object):
+    """Lower bound of the soft constraints cost of a task:domain dict
+    * deadlines, a task:(deadline, cost per hour late) dict
+    * calendar, the Calendar the lateness is counted in
+    * costs, a task:{value:cost} dict of the values whose cost was asked for
+    The cost of a task never decreases with its end, so the cheapest value left
+    in a domain is the one that ends first; the bound of a node is the sum
+    over the tasks of the cost of their earliest end.
+    Deadlines are changed with set_deadline() and remove_deadline(), which
+    keep costs up to date.
+    """
+    def __init__(self, soft_constraints, soft_constraints_cost, calendar=None):
+        self.deadlines = {task: (soft_constraints[task], soft_constraints_cost[task])
+                          for task in soft_constraints}
+        self.calendar = calendar or default_calendar
+        self.costs = {task: {} for task in self.deadlines}
+
+    def value_cost(self, task, val):
+        """returns the cost of value val of task; 0 for a task without a deadline.
+        The cost of a value is computed once and then read from costs."""
+        costs = self.costs.get(task)
+        if costs is None:
+            return 0
+        cost = costs.get(val)
+        if cost is None:
+            deadline, weight = self.deadlines[task]
+            cost = costs[val] = soft_cost(val[1], deadline, weight, self.calendar)
+        return cost
+
+    def set_deadline(self, task, deadline, weight):
+        """gives task the deadline and the cost per hour late weight"""
+        self.deadlines[task] = (deadline, weight)
+        self.costs[task] = {}
+
+    def remove_deadline(self, task):
+        """removes the deadline of task, which must have one"""
+        del self.deadlines[task]
+        del self.costs[task]
+
+    def task_bound(self, task, dom):
+        """returns the cheapest cost of the values in dom; 0 for an empty dom"""
+        if not dom:
+            return 0
+        deadline, weight = self.deadlines[task]
+        return soft_cost(dom.bounds(1)[0], deadline, weight, self.calendar)
+
+    def bound(self, domains):
+        """returns the bound of domains computed over all the tasks"""
+        return sum(self.task_bound(task, domains[task]) for task in self.deadlines)
+
+    def node(self, domains):
+        """returns domains as a Cost_node carrying its bound"""
+        node = Cost_node(domains)
+        node.bound = self.bound(node)
+        return node
+
+    def child_bound(self, parent, child, changed):
+        """returns the bound of child from the bound of the Cost_node parent,
+        where changed are the only tasks whose domains differ between them.
+        """
+        bound = parent.bound
+        for task in changed:
+            if task in self.deadlines:
+                bound += self.task_bound(task, child[task]) - self.task_bound(task, parent[task])
+        return bound
 
 """
-Define a set of Static objects and replace working days and times with numbers
-* 'mon': 1, 'tue': 2, 'wed': 3, 'thu': 4, 'fri': 5
-* '9am': 1, '10am': 2, '11am': 3, '12pm': 4, '1pm': 5, '2pm': 6, '3pm': 7, '4pm': 8, '5pm': 9
-* define domain value use double-digit
-* length_of_time -- a dict include tasks duration hours
-* task_basic_value -- a dict tasks include start time and end time, and end time brfore 5pm
-* hard_constraints  -- a list include all hard constraints
- * soft_constraints -- a dict include all tasks soft constraints
-* soft_constraints_cost -- a dict include all tasks soft constraints cost
+Define a set of Static objects
+* default_calendar -- mon to fri, 9am to 5pm in one hour slots; a time is coded
+  as day number * day_stride + time number, e.g. 'mon 9am' is 101
 """
-day_num = {'mon': '1', 'tue': '2', 'wed': '3', 'thu': '4', 'fri': '5'}
-time_num = {'9am': '1', '10am': '2', '11am': '3', '12pm': '4', '1pm': '5', '2pm': '6', '3pm': '7', '4pm': '8', '5pm': '9'}
-domain = {'11', '12', '13', '14', '15', '16', '17', '18', '19',
-          '21', '22', '23', '24', '25', '26', '27', '28', '29',
-          '31', '32', '33', '34', '35', '36', '37', '38', '39',
-          '41', '42', '43', '44', '45', '46', '47', '48', '49',
-          '51', '52', '53', '54', '55', '56', '57', '58', '59'}
-length_of_time = {}
-task_basic_value = {}
-hard_constraints = []
-soft_constraints = {}
-soft_constraints_cost = {}
+default_calendar = Calendar()
+searchers = {'greedy': GreedySearcher, 'bnb': DF_branch_and_bound, 'parallel': Parallel_searcher,
+             'local': Local_searcher}
 
 # get input data follow binary constraint
 def binary_constraints_before(contrast_one,contrast_two):
@@ -161,228 +311,468 @@ def binary_constraints_after(contrast_one,contrast_two):
     return contrast_two[1] <= contrast_one[0]
 
 def binary_constraints_sameday(contrast_one,contrast_two):
-    return contrast_one[0]//10 == contrast_two[0]//10
+    return contrast_one[0]//day_stride == contrast_two[0]//day_stride
 
 def binary_constraints_startsat(contrast_one,contrast_two):
     return contrast_one[0] == contrast_two[1]
 
+# the precedences as difference constraints val_i[field_i] - val_j[field_j] <= weight,
+# propagated on the start bounds by cspTemporal.Temporal_network
+binary_constraints_before.differences = (((0, 1), (1, 0), 0),)
+binary_constraints_after.differences = (((1, 1), (0, 0), 0),)
+binary_constraints_startsat.differences = (((0, 0), (1, 1), 0), ((1, 1), (0, 0), 0))
+
+# the values of one task of a binary constraint supported by the domain of the other,
+# computed on the intervals of their starts so that an Interval_domain is never enumerated
+def supported_sameday(position, dom, other):
+    days = sorted({day for low, high in other.start_intervals()
+                   for day in range(low // day_stride, high // day_stride + 1)})
+    return dom.starting_in((day * day_stride, day * day_stride + day_stride - 1) for day in days)
+
+def supported_startsat(position, dom, other):
+    if not dom or not other:
+        return dom.starting_in(())
+    # task one starts when task two ends, i.e. its duration after task two starts
+    shift = start_offset(other, 1) if position == 0 else -start_offset(dom, 1)
+    return dom.starting_in((low + shift, high + shift) for low, high in other.start_intervals())
+
+binary_constraints_sameday.supported = supported_sameday
+binary_constraints_startsat.supported = supported_startsat
+
 # get input data follow hard constraint
+# a day is a day number and a time a time number of the Calendar
 def hard_constraints_day(day):
     """is a value"""
     # isv = lambda x: x == val   # alternative definition
     # isv = partial(eq,val)      # another alternative definition
-    def isv(x): return x[0]//10 == int(day)
-    isv.__name__ = day+"=="
+    def isv(x): return x[0]//day_stride == day
+    isv.__name__ = str(day)+"=="
+    isv.bounds = (0, day * day_stride, day * day_stride + day_stride - 1)
     return isv
 
 def hard_constraints_time(time):
-    def isv(x): return x[0]%10 == int(time)
-    isv.__name__ = time+"=="
+    def isv(x): return x[0]%day_stride == time
+    isv.__name__ = str(time)+"=="
     return isv
 
 def hard_constraints_startsbefore_daytime(day,time):
-    def isv(x): return x[0] <= int(day + time)
+    giventime = day * day_stride + time
+    def isv(x): return x[0] <= giventime
+    isv.bounds = (0, None, giventime)
     return isv
 
 def hard_constraints_startsafter_daytime(day,time):
-
-    def isv(x): return x[0] >= int(day + time)
+    giventime = day * day_stride + time
+    def isv(x): return x[0] >= giventime
+    isv.bounds = (0, giventime, None)
     return isv
 
 def hard_constraints_endsbefore_daytime(day,time):
-    def isv(x): return x[1] <= int(day + time)
+    giventime = day * day_stride + time
+    def isv(x): return x[1] <= giventime
+    isv.bounds = (1, None, giventime)
     return isv
 
 def hard_constraints_endsafter_daytime(day,time):
-    def isv(x): return x[1] >= int(day + time)
+    giventime = day * day_stride + time
+    def isv(x): return x[1] >= giventime
+    isv.bounds = (1, giventime, None)
     return isv
 
 def hard_constraints_startin(day1,time1,day2,time2):
-    def isv(x):
-        giventime1 = int(day1 + time1)
-        giventime2 = int(day2 + time2)
-        return x[0]>=giventime1 and x[0]<=giventime2
+    giventime1 = day1 * day_stride + time1
+    giventime2 = day2 * day_stride + time2
+    def isv(x): return x[0]>=giventime1 and x[0]<=giventime2
+    isv.bounds = (0, giventime1, giventime2)
     return isv
 
 def hard_constraints_endin(day1,time1,day2,time2):
-    def isv(x): return x[1]>=int(day1 + time1) and x[1]<=int(day2 + time2)
+    giventime1 = day1 * day_stride + time1
+    giventime2 = day2 * day_stride + time2
+    def isv(x): return x[1]>=giventime1 and x[1]<=giventime2
+    isv.bounds = (1, giventime1, giventime2)
     return isv
 
 def hard_constraints_startsbefore_time(time):
-    def isv(x): return x[0]%10 <= int(time)
-    isv.__name__ = time + "<="
+    def isv(x): return x[0]%day_stride <= time
+    isv.__name__ = str(time) + "<="
     return isv
 
 def hard_constraints_endsbefore_time(time):
-    def isv(x): return x[1]%10 <= int(time)
-    isv.__name__ = time + "<="
+    def isv(x): return x[1]%day_stride <= time
+    isv.__name__ = str(time) + "<="
     return isv
 
 def hard_constraints_startsafter_time(time):
-    def isv(x): return x[0]%10 >= int(time)
-    isv.__name__ = time + ">="
+    def isv(x): return x[0]%day_stride >= time
+    isv.__name__ = str(time) + ">="
     return isv
 
 def hard_constraints_endsafter_time(time):
-    def isv(x): return x[1]%10 >= int(time)
-    isv.__name__ = time + ">="
+    def isv(x): return x[1]%day_stride >= time
+    isv.__name__ = str(time) + ">="
     return isv
 
-# get tasks with name and duration, and get domain with all possible work time
-def read_task_basic_value(line):
-    if line[0] == 'task':
-        length_of_time[line[1]] = line[2]
-        temp = set()
-        duration = int(line[2])
-        for str in domain:
-            if int(str[1]) + duration <= 9:
-                temp.add(int(str))
-        task_basic_value[line[1]] = set((t, t + duration) for t in temp)
-    else:
-        pass
-    return task_basic_value
+# fold the unary hard constraints into the task domains before the CSP is built (node consistency)
+def node_consistent(domains, constraints):
+    """returns (domains, constraints) where every unary constraint has been applied
+    to the domain of its task (as one bitmask for a Slot_domain) and removed
+    from the constraints
+    """
+    domains = dict(domains)
+    remaining = []
+    for con in constraints:
+        if len(con.scope) == 1:
+            task = con.scope[0]
+            dom = domains[task]
+            domains[task] = dom.satisfying(con.condition)
+        else:
+            remaining.append(con)
+    return domains, remaining
+
+# get the soft constraints cost of a task that ends at end, counting 24 hours per day late
+def soft_cost(end, deadline, weight, calendar=None):
+    if end <= deadline:
+        return 0
+    return weight * (calendar or default_calendar).lateness(end, deadline)
 
 # define heuristic() function to calculation the Minimum soft constraints cost
+# every task contributes the cheapest cost left in its domain, so this never overestimates
 def heuristic (Search_with_AC_from_Cost_CSP, node) :
-    cost_min = []
-    for task_num in node:
-        if task_num in Search_with_AC_from_Cost_CSP.soft_constraints:
-            cost_list = []
-            last_time = int(Search_with_AC_from_Cost_CSP.soft_constraints[task_num])
-            for costs in node[task_num]:
-                if costs[1] > last_time:
-                    if (costs[1] // 10 - last_time // 10) ==0:
-                        min_cost = ((costs[1] % 10) - (last_time % 10))
-                    else:
-                        over_oneday_cost = (costs[1] // 10 - last_time // 10) * 24
-                        same_day_cost = ((costs[1] % 10) - (last_time % 10))
-                        min_cost = over_oneday_cost + same_day_cost
-                    cost_list.append(Search_with_AC_from_Cost_CSP.soft_constraints_cost[task] * min_cost)
-                else:
-                    cost_list.append(0)
-            if len(cost_min) != 0:
-                cost_list.append(min(cost_list))
-    min_cost = sum(cost_min)
-    return min_cost
-
-# Read input*.txt and change information to dict number that can easy to calculate binary_constraint、hard_constraints、soft_constraints
-filename = sys.argv[1]
-with open(filename,'r') as file:
-    for line in file:
-        line = line.strip()
-        line = line.strip()
-        line = line.replace(',', '')
-        line = line.replace('-', '')
-        line = line.split(' ')
-        if '#' in line:
-            continue
-        if line[0] == '':
+    return Search_with_AC_from_Cost_CSP.soft_bound.bound(node)
+
+# A scheduling instance, read from an input*.txt by parse()
+class Problem(object):
+    """A Problem consists of
+    * length_of_time, a task:duration dictionary
+    * task_basic_value, a task:domain dictionary of all the possible work times,
+      Slot_domains or, on a long calendar, Interval_domains
+    * hard_constraints, a list of the unary and binary Constraints and of one
+      Cumulative Constraint per resource
+    * soft_constraints, a task:deadline dictionary
+    * soft_constraints_cost, a task:cost per hour late dictionary
+    * calendar, the Calendar the days and times are read in
+    * declared, the tasks declared before the lines read, which they may name
+    """
+    def __init__(self):
+        self.calendar = default_calendar
+        self.declared = set()
+        self.length_of_time = {}
+        self.task_basic_value = {}
+        self.hard_constraints = []
+        self.soft_constraints = {}
+        self.soft_constraints_cost = {}
+
+    def soft_csp(self):
+        """returns the Soft_CSP of the problem, with the unary constraints folded into the domains"""
+        domains, constraints = node_consistent(self.task_basic_value, self.hard_constraints)
+        return Soft_CSP(domains, constraints, self.soft_constraints, self.soft_constraints_cost,
+                        self.calendar)
+
+# get tasks with name and duration, and get domain with all possible work time
+def read_task(problem, line):
+    problem.length_of_time[line[1]] = line[2]
+    calendar = problem.calendar
+    problem.task_basic_value[line[1]] = calendar.task_domain(calendar.slots(line[2]))
+
+# check that the tasks a line names are declared
+def known_tasks(problem, tasks):
+    for task in tasks:
+        if task not in problem.length_of_time and task not in problem.declared:
+            raise ValueError(f"unknown task {task!r}")
+    return tuple(tasks)
+
+# get tasks binary constraints: constraint, task1 relation task2
+def read_constraint(problem, line):
+    condition = binary_conditions.get(line[2].replace('-', ''))
+    if condition is not None:
+        problem.hard_constraints.append(Constraint(known_tasks(problem, (line[1], line[3])),
+                                                   condition))
+
+# get task hard domain constraints and soft deadlines: domain, task ...
+def read_domain(problem, line):
+    days = problem.calendar.days
+    times = problem.calendar.times
+    task, = known_tasks(problem, line[1:2])
+    keyword = line[2].replace('-', '')
+    if len(line) == 3:
+        if keyword in days:
+            problem.hard_constraints.append(Constraint((task,), hard_constraints_day(days[keyword])))
+        elif keyword in times:
+            problem.hard_constraints.append(Constraint((task,), hard_constraints_time(times[keyword])))
+    elif keyword == 'endsby':
+        problem.soft_constraints[task] = problem.calendar.code(line[3], line[4])
+        problem.soft_constraints_cost[task] = int(line[5])
+    elif keyword in range_constraints:
+        # e.g. starts-in mon 10am-tue 5pm
+        time1, day2 = line[4].split('-')
+        problem.hard_constraints.append(Constraint((task,), range_constraints[keyword](
+            days[line[3]], times[time1], days[day2], times[line[5]])))
+    elif keyword in daytime_constraints and line[3] in days:
+        problem.hard_constraints.append(Constraint((task,), daytime_constraints[keyword](
+            days[line[3]], times[line[4]])))
+    elif keyword in time_constraints and line[3] in times:
+        problem.hard_constraints.append(Constraint((task,), time_constraints[keyword](
+            times[line[3]])))
+
+# get the calendar of the instance, before any task: calendar, mon-fri 9am-5pm [slot minutes [weeks]]
+def read_calendar(problem, line):
+    if problem.length_of_time:
+        raise ValueError("the calendar line must come before the tasks")
+    first_day, last_day = line[1].split('-')
+    start, end = line[2].split('-')
+    slot_minutes = int(line[3]) if len(line) > 3 else 60
+    weeks = int(line[4]) if len(line) > 4 else 1
+    problem.calendar = Calendar(first_day, last_day, start, end, slot_minutes, weeks)
+
+# get a resource shared by tasks, at most capacity of them at any time: resource, name capacity task1 task2 ...
+def read_resource(problem, line):
+    if len(line) < 4:
+        raise ValueError("a resource needs a name, a capacity and at least one task")
+    problem.hard_constraints.append(Constraint(known_tasks(problem, line[3:]),
+                                               Cumulative(line[1], int(line[2]),
+                                                          problem.calendar.working_time)))
+
+line_parsers = {'task': read_task, 'constraint': read_constraint, 'domain': read_domain,
+                'resource': read_resource, 'calendar': read_calendar}
+binary_conditions = {'before': binary_constraints_before,
+                     'after': binary_constraints_after,
+                     'sameday': binary_constraints_sameday,
+                     'startsat': binary_constraints_startsat}
+daytime_constraints = {'startsbefore': hard_constraints_startsbefore_daytime,
+                       'startsafter': hard_constraints_startsafter_daytime,
+                       'endsbefore': hard_constraints_endsbefore_daytime,
+                       'endsafter': hard_constraints_endsafter_daytime}
+time_constraints = {'startsbefore': hard_constraints_startsbefore_time,
+                    'startsafter': hard_constraints_startsafter_time,
+                    'endsbefore': hard_constraints_endsbefore_time,
+                    'endsafter': hard_constraints_endsafter_time}
+range_constraints = {'startsin': hard_constraints_startin,
+                     'endsin': hard_constraints_endin}
+
+# Read input*.txt lines and change information to dict number that can easy to calculate binary_constraint、hard_constraints、soft_constraints
+def parse(stream, calendar=None, declared=()):
+    """returns the Problem read from stream, any iterable of lines (e.g. an open file).
+    Lines are consumed one at a time; comments, blank lines and lines of an
+    unknown kind are skipped. calendar is the Calendar to read the lines in
+    when they have no calendar line (by default the default calendar);
+    declared are the tasks declared before stream, which its lines may name.
+    A line that names an unknown task, day or time, or misses a field, raises
+    ValueError saying which line it is, e.g. "unknown task 'b' in constraint line 3".
+    """
+    problem = Problem()
+    if calendar is not None:
+        problem.calendar = calendar
+    problem.declared = set(declared)
+    for number, line in enumerate(stream, 1):
+        line = line.replace(',', ' ').split()
+        if not line or line[0].startswith('#'):
             continue
-        # get tasks name and duration in dict
-        task_basic_value = read_task_basic_value(line)
-        # get tasks binary constraints in dict
-        if line[0] == 'constraint':
-            contrast_one = line[1]
-            contrast_two = line[-1]
-            if 'before' in line:
-                hard_constraints.append(Constraint((contrast_one, contrast_two), binary_constraints_before))
-            if 'after' in line:
-                hard_constraints.append(Constraint((contrast_one, contrast_two), binary_constraints_after))
-            if 'sameday' in line:
-                hard_constraints.append(Constraint((contrast_one, contrast_two), binary_constraints_sameday))
-            if 'startsat' in line:
-                hard_constraints.append(Constraint((contrast_one, contrast_two), binary_constraints_startsat))
-        # get tasks soft constraints in dict
-        elif (line[0] == 'domain') and (line[2] =='endsby'):
-            task = line[1]
-            day = day_num[line[3]]
-            time = time_num[line[4]]
-            soft_constraints_cost[task] = int(line[-1])
-            soft_constraints[task] = int(day + time)
-        # get task hard domain constraints in *tuple
-        elif len(line)==3:
-            task = line[1]
-            if (line[0] == 'domain') and (line[2] in day_num):
-                day = day_num[line[2]]
-                hard_constraints.append(Constraint((task,), hard_constraints_day(day)))
-            elif (line[0] == 'domain') and (line[2] in time_num):
-                time = time_num[line[2]]
-                hard_constraints.append(Constraint((task,), hard_constraints_time(time)))
-        elif len(line)>3:
-            task = line[1]
-            if (line[0] == 'domain') and (line[2] == 'startsbefore') and (line[3] in day_num):
-                day = day_num[line[-2]]
-                time = time_num[line[-1]]
-                hard_constraints.append(Constraint((task,), hard_constraints_startsbefore_daytime(day, time)))
-            elif (line[0] == 'domain') and (line[2] == 'startsafter') and (line[3] in day_num):
-                day = day_num[line[-2]]
-                time = time_num[line[-1]]
-                hard_constraints.append(Constraint((task,), hard_constraints_startsafter_daytime(day, time)))
-            elif (line[0] == 'domain') and (line[2] == 'endsbefore') and (line[3] in day_num):
-                day = day_num[line[-2]]
-                time = time_num[line[-1]]
-                hard_constraints.append(Constraint((task,), hard_constraints_endsbefore_daytime(day, time)))
-            elif (line[0] == 'domain') and (line[2] == 'endsafter') and (line[3] in day_num):
-                day = day_num[line[-2]]
-                time = time_num[line[-1]]
-                hard_constraints.append(Constraint((task,), hard_constraints_endsafter_daytime(day, time)))
-            elif (line[0] == 'domain') and (line[2] == 'startsin'):
-                day1 = day_num[line[3]]
-                if len(line[4])==6:
-                    time=line[4][0:3]
-                    day=line[4][3:6]
-                else:
-                    time=line[4][0:4]
-                    day=line[4][4:7]
-                time1 = time_num[time]
-                day2 = day_num[day]
-                time2 = time_num[line[5]]
-                hard_constraints.append(Constraint((task,), hard_constraints_startin(day1, time1, day2, time2)))
-            elif (line[0] == 'domain') and (line[2] == 'endsin'):
-                day1 = day_num[line[3]]
-                if len(line[4])==6:
-                    time=line[4][0:3]
-                    day=line[4][3:6]
-                else:
-                    time=line[4][0:4]
-                    day=line[4][4:7]
-                time1 = time_num[time]
-                day2 = day_num[day]
-                time2 = time_num[line[5]]
-                hard_constraints.append(Constraint((task,), hard_constraints_endin(day1, time1, day2, time2)))
-            elif (line[0] == 'domain') and (line[2] == 'startsbefore') and (line[3] in time_num):
-                if len(line) == 5:
-                    time = time_num[line[-1]]
-                    hard_constraints.append(Constraint((task,), hard_constraints_startsbefore_time(time)))
-            elif (line[0] == 'domain') and (line[2] == 'endsbefore') and (line[3] in time_num):
-                time = time_num[line[-1]]
-                hard_constraints.append(Constraint((task,), hard_constraints_endsbefore_time(time)))
-            elif (line[0] == 'domain') and (line[2] == 'startsafter') and (line[3] in time_num):
-                time = time_num[line[-1]]
-                hard_constraints.append(Constraint((task,), hard_constraints_startsafter_time(time)))
-            elif (line[0] == 'domain') and (line[2] == 'endsafter') and (line[3] in time_num):
-                time = time_num[line[-1]]
-                hard_constraints.append(Constraint((task,), hard_constraints_endsafter_time(time)))
+        read_line = line_parsers.get(line[0])
+        if read_line is not None:
+            try:
+                read_line(problem, line)
+            except KeyError as error:
+                raise ValueError(f"unknown name {error.args[0]!r} in {line[0]} line {number}") from None
+            except IndexError:
+                raise ValueError(f"missing field in {line[0]} line {number}") from None
+            except ValueError as error:
+                raise ValueError(f"{error} in {line[0]} line {number}") from None
+    return problem
+
+# search a Problem with one of the searchers
+def solve(problem, searcher='greedy', strategy={}, stats=None, **kwargs):
+    """returns (path, searcher) where path is the schedule found by searchers[searcher]
+    (None if there is none) and searcher is the searcher used.
+    strategy is a dict of the search strategy of Search_with_AC_from_Cost_CSP;
+    stats is a searchStats.Search_stats that counts the build and the search, or None;
+    the counting stops when the search ends; kwargs go to the searcher
+    """
+    if stats is None:
+        search_problem = Search_with_AC_from_Cost_CSP(problem.soft_csp(), **strategy)
+    else:
+        with stats.timer('build'):
+            search_problem = Search_with_AC_from_Cost_CSP(problem.soft_csp(), **strategy)
+    return run_searcher(search_problem, searcher, stats, **kwargs)
+
+# search a Search_with_AC_from_Cost_CSP, which can be reused for many searches
+def run_searcher(search_problem, searcher='greedy', stats=None, **kwargs):
+    """returns (path, searcher) as solve() does"""
+    searcher = make_searcher(search_problem, searcher, **kwargs)
+    if stats is None:
+        return searcher.search(), searcher
+    stats.instrument(search_problem, searcher)
+    try:
+        with stats.timer('search'):
+            return searcher.search(), searcher
+    finally:
+        stats.uninstrument()
+
+# one of the searchers, or a Component_searcher running it on every component
+def make_searcher(search_problem, searcher='greedy', components=False, **kwargs):
+    """returns searchers[searcher] for search_problem, or with components a
+    fuzzyComponents.Component_searcher that runs it on every connected
+    component of search_problem separately; kwargs go to the searcher"""
+    if not components:
+        return searchers[searcher](search_problem, **kwargs)
+    from fuzzyComponents import Component_searcher     # fuzzyComponents imports this module
+    return Component_searcher(search_problem, searcher, **kwargs)
+
+# search a Problem within a budget, reporting every better schedule as soon as it is found
+def solve_anytime(problem, searcher='bnb', strategy={}, seconds=None, nodes=None,
+                  callback=None, stats=None, **kwargs):
+    """returns (path, searcher) as solve() does, where path is the best schedule
+    found before seconds went by or nodes nodes were expanded (None for no limit).
+    callback(path, cost, elapsed seconds) is called for every schedule cheaper
+    than the ones before, as soon as it is found; searcher.exhausted is True if
+    the budget ran out and searcher.optimal (where the searcher has it) if the
+    schedule is proven optimal. searchers[searcher](...).solutions() is the
+    same stream as a generator. stats is as in solve(); the time of the
+    callbacks is part of its search time.
+    """
+    if stats is None:
+        search_problem = Search_with_AC_from_Cost_CSP(problem.soft_csp(), **strategy)
+    else:
+        with stats.timer('build'):
+            search_problem = Search_with_AC_from_Cost_CSP(problem.soft_csp(), **strategy)
+    search = make_searcher(search_problem, searcher, budget=Budget(seconds, nodes), **kwargs)
+    if stats is not None:
+        stats.instrument(search_problem, search)
+    best = None
+    try:
+        with stats.timer('search') if stats is not None else nullcontext():
+            for best, cost, elapsed in search.solutions():
+                if callback is not None:
+                    callback(best, cost, elapsed)
+    finally:
+        if stats is not None:
+            stats.uninstrument()
+    return best, search
+
+# get the start of every task of a solved node in the input format, e.g. {'t1': 'mon 9am'}
+def schedule_of(node, calendar=None):
+    calendar = calendar or default_calendar
+    return {task: calendar.label(select(node[task])[0]) for task in node}
 
 # Modify the standard display format like assignment requirement output
 def output_display(min_soft_scheme,search_problem):
     if min_soft_scheme is not None:
         best_scheme=min_soft_scheme.end()
-        for task in min_soft_scheme.end():
-            day = str(list(best_scheme[task])[0][0])[0]
-            time = str(list(best_scheme[task])[0][0])[1]
-            for day_key in day_num:
-                if day_num[day_key] == day:
-                    day = day_key
-            for time_key in time_num:
-                if time_num[time_key] == time:
-                    time = time_key
-            print(f'{task}:{day} {time}')
-        print(f'cost:{search_problem.heuristic(best_scheme)}')
+        for task, start in schedule_of(best_scheme, search_problem.calendar).items():
+            print(f'{task}:{start}')
+        cost = search_problem.heuristic(best_scheme)
+        print(f'cost:{int(cost) if cost == int(cost) else cost}')   # a fraction of an hour late can cost a fraction
     else:
         print('No solution')
 
-soft_CSP = Soft_CSP(task_basic_value,hard_constraints,soft_constraints,soft_constraints_cost)
-search_problem = Search_with_AC_from_Cost_CSP(soft_CSP)
-min_soft_scheme = GreedySearcher(search_problem).search()
-output_display(min_soft_scheme,search_problem)
+# the number of nodes expanded by every var order and value order
+def compare_strategies(problem, searcher='greedy', strategy={}):
+    """returns a list of (var_order, value_order, nodes expanded), each solving
+    problem with searcher and strategy but for its var_order and value_order
+    """
+    table = []
+    for var_order in var_orders:
+        for value_order in value_orders:
+            _, search = solve(problem, searcher, dict(strategy, var_order=var_order,
+                                                      value_order=value_order))
+            table.append((var_order, value_order, search.num_expanded))
+    return table
+
+# print the statistics of a search to stderr in the format chosen on the command line
+def print_stats(stats, form):
+    if stats is not None:
+        print(stats.to_json(indent=2) if form == 'json' else stats.to_prometheus(),
+              file=sys.stderr, end='\n' if form == 'json' else '')
+
+# print what the visited table of a searcher (if it has one) skipped to stderr
+def print_visited(searcher):
+    visited = getattr(searcher, 'visited', None)
+    if visited is not None:
+        print(f"visited: {visited.pruned} duplicates pruned, {visited.evicted} states evicted",
+              file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fuzzy scheduling with arc consistency and domain splitting")
+    parser.add_argument('filename', help="the input*.txt file of the instance")
+    parser.add_argument('searcher', nargs='?', default='greedy', choices=sorted(searchers),
+                        help="greedy (default), bnb for a proven minimum cost schedule, "
+                             "parallel for bnb on all cores, or local for large instances")
+    parser.add_argument('--visited', type=int, metavar='N',
+                        help="skip states already expanded, remembering at most N of them")
+    parser.add_argument('--var-order', default='first', choices=sorted(var_orders),
+                        help="how the task to split is chosen (default: first)")
+    parser.add_argument('--split', default='halve', choices=sorted(splits),
+                        help="how its domain is split (default: halve)")
+    parser.add_argument('--value-order', default='low', choices=sorted(value_orders),
+                        help="which part of the split is searched first (default: low)")
+    parser.add_argument('--seed', type=int, default=None, help="seed of the random orderings")
+    parser.add_argument('--components', action='store_true',
+                        help="solve the connected components of the instance separately, "
+                             "each with the searcher")
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help="the worker processes of --components (default: one per core)")
+    parser.add_argument('--iterations', type=int, metavar='N',
+                        help="the number of steps of the local searcher (default: 5000)")
+    parser.add_argument('--time-limit', type=float, metavar='SECONDS',
+                        help="stop after SECONDS and print the best schedule found so far")
+    parser.add_argument('--node-limit', type=int, metavar='N',
+                        help="stop after N expansions and print the best schedule found so far")
+    parser.add_argument('--stream', action='store_true',
+                        help="print every better schedule as soon as it is found, "
+                             "each with an elapsed:seconds line")
+    parser.add_argument('--stats', choices=('json', 'prometheus'),
+                        help="print the counters and timers of the search to stderr in this format")
+    parser.add_argument('--compare', action='store_true',
+                        help="print the nodes expanded by every var order and value order instead")
+    args = parser.parse_args(argv)
+    with open(args.filename, 'r') as file:
+        problem = parse(file)
+    strategy = {'var_order': args.var_order, 'split': args.split,
+                'value_order': args.value_order, 'seed': args.seed}
+    if args.compare:
+        for var_order, value_order, expanded in compare_strategies(problem, args.searcher, strategy):
+            print(f'{var_order:>8} {value_order:>8} {expanded}')
+        return
+    kwargs = {}
+    if args.visited:
+        if args.searcher in ('parallel', 'local'):
+            parser.error(f"--visited is not an option of the {args.searcher} searcher")
+        kwargs['visited'] = Visited_table(args.visited)
+    if args.components:
+        kwargs['components'] = True
+        kwargs['workers'] = args.workers
+    elif args.workers is not None:
+        parser.error("--workers is an option of --components")
+    if args.iterations is not None:
+        if args.searcher != 'local':
+            parser.error("--iterations is an option of the local searcher")
+        kwargs['iterations'] = args.iterations
+    stats = Search_stats() if args.stats else None
+    if args.time_limit is None and args.node_limit is None and not args.stream:
+        min_soft_scheme, searcher = solve(problem, args.searcher, strategy, stats, **kwargs)
+        output_display(min_soft_scheme, searcher.problem)
+        print_visited(searcher)
+        print_stats(stats, args.stats)
+        return
+    calendar = problem.calendar
+
+    def stream(path, cost, elapsed):
+        for task, start in schedule_of(path.end(), calendar).items():
+            print(f'{task}:{start}')
+        print(f'cost:{int(cost) if cost == int(cost) else cost}')
+        print(f'elapsed:{elapsed:.3f}\n', flush=True)
+    min_soft_scheme, searcher = solve_anytime(problem, args.searcher, strategy, args.time_limit,
+                                              args.node_limit, stream if args.stream else None,
+                                              stats, **kwargs)
+    if searcher.exhausted and min_soft_scheme is None:
+        print('No solution found within the budget')
+    else:
+        if searcher.exhausted:
+            print("the budget ran out; the schedule is the best one found", file=sys.stderr)
+        if not args.stream or min_soft_scheme is None:
+            output_display(min_soft_scheme, searcher.problem)
+    print_visited(searcher)
+    print_stats(stats, args.stats)
+
+if __name__ == '__main__':
+    main()
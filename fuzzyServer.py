@@ -0,0 +1,163 @@
+"""
+This module keeps the fuzzy scheduler running as a long-lived service, so that
+each request costs a search instead of a Python start, import and parse.
+
+Requests and responses are JSON objects, one per line (JSON Lines). They are
+read from standard input and answered on standard output, or served on a
+local Unix socket (--socket PATH) or a localhost TCP port (--port N).
+
+A request has
+* instance, the text of an input*.txt (a string, or a list of its lines), or
+  path, the name of an input*.txt file
+* searcher, optionally one of fuzzyScheduler.searchers (default 'greedy')
+* id, optionally anything; it is copied into the response
+
+A response has id, status ('solved', 'no solution' or 'error'), schedule,
+cost, time (seconds, excluding the JSON handling) and nodes_expanded, plus
+error for an 'error' response: the message of a bad request (a line that is
+not a JSON object with instance or path, an unknown searcher, or the line of the instance that cannot be read), or the type and
+message of any other exception.
+
+The search problems of recent instances stay in memory, keyed by the instance
+text, together with their arc consistent start node and compiled support
+tables; the support tables of every task duration are shared by all instances.
+
+Object Class:
+
+Scheduler_service -- answers requests, with an LRU cache of search problems
+
+Functions:
+
+serve_stream() -- answer the requests read from a stream
+serve_socket() -- answer the requests of clients of a Unix socket or a TCP port
+request() -- send one request to a running service and return its response
+main() -- the command line
+"""
+import argparse
+import json
+import socket
+import socketserver
+import sys
+import time
+from collections import OrderedDict
+from fuzzyScheduler import parse, run_searcher, searchers, Search_with_AC_from_Cost_CSP
+from fuzzyBatch import solution_record
+
+class Scheduler_service(object):
+    """A Scheduler_service consists of
+    * problems, an instance text:Search_with_AC_from_Cost_CSP dictionary of
+      the cache_size most recently used instances
+    * hits and misses, the number of requests that did or did not find their
+      instance in problems
+    """
+    def __init__(self, cache_size=256):
+        self.cache_size = cache_size
+        self.problems = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def search_problem(self, text):
+        """returns the search problem of the instance text, from the cache if it is there"""
+        if text in self.problems:
+            self.hits += 1
+            self.problems.move_to_end(text)
+        else:
+            self.misses += 1
+            problem = parse(text.splitlines())
+            self.problems[text] = Search_with_AC_from_Cost_CSP(problem.soft_csp())
+            if len(self.problems) > self.cache_size:
+                self.problems.popitem(last=False)
+        return self.problems[text]
+
+    def handle(self, message):
+        """returns the response dictionary to the request message, the decoded
+        JSON of a request line; it need not be a well formed request"""
+        if not isinstance(message, dict) or not ('instance' in message or 'path' in message):
+            return {'id': message.get('id') if isinstance(message, dict) else None,
+                    'status': 'error', 'error': "request must be an object with 'instance' or 'path'",
+                    'time': 0}
+        response = {'id': message.get('id')}
+        start = time.perf_counter()
+        try:
+            if 'instance' in message:
+                text = message['instance']
+                if not isinstance(text, str):
+                    text = '\n'.join(text)
+            else:
+                with open(message['path'], 'r') as file:
+                    text = file.read()
+            searcher = message.get('searcher', 'greedy')
+            if searcher not in searchers:
+                raise ValueError(f"unknown searcher {searcher!r}, expected one of {sorted(searchers)}")
+            search_problem = self.search_problem(text)
+            response.update(solution_record(*run_searcher(search_problem, searcher)))
+        except ValueError as error:
+            response['status'] = 'error'
+            response['error'] = str(error)
+        except Exception as error:
+            response['status'] = 'error'
+            response['error'] = f'{type(error).__name__}: {error}'
+        response['time'] = time.perf_counter() - start
+        return response
+
+    def handle_line(self, line):
+        """returns the JSON response line to the JSON request line"""
+        try:
+            message = json.loads(line)
+        except ValueError as error:
+            return json.dumps({'id': None, 'status': 'error', 'error': f'bad request: {error}'}) + '\n'
+        return json.dumps(self.handle(message)) + '\n'
+
+# answer the requests read from a stream
+def serve_stream(service, infile=sys.stdin, outfile=sys.stdout):
+    for line in infile:
+        if line.strip():
+            outfile.write(service.handle_line(line))
+            outfile.flush()
+
+# answer the requests of clients of a Unix socket or a TCP port, one client at a time
+def serve_socket(service, path=None, port=None):
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if line.strip():
+                    self.wfile.write(service.handle_line(line.decode()).encode())
+                    self.wfile.flush()
+    if path is not None:
+        server = socketserver.UnixStreamServer(path, Handler)
+    else:
+        server = socketserver.TCPServer(('127.0.0.1', port), Handler)
+    with server:
+        server.serve_forever()
+
+# send one request to a running service
+def request(message, path=None, port=None):
+    """returns the response dictionary of the service at Unix socket path or at
+    localhost port to the request dictionary message
+    """
+    if path is not None:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(path)
+    else:
+        connection = socket.create_connection(('127.0.0.1', port))
+    with connection, connection.makefile('rwb') as stream:
+        stream.write((json.dumps(message) + '\n').encode())
+        stream.flush()
+        return json.loads(stream.readline())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve fuzzy scheduling requests as JSON Lines")
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument('--socket', metavar='PATH', help="serve on this Unix socket")
+    where.add_argument('--port', type=int, help="serve on this localhost TCP port")
+    parser.add_argument('--cache-size', type=int, default=256,
+                        help="number of instances kept warm (default: 256)")
+    args = parser.parse_args(argv)
+    service = Scheduler_service(args.cache_size)
+    if args.socket is None and args.port is None:
+        serve_stream(service)
+    else:
+        serve_socket(service, args.socket, args.port)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+# intervalDomain.py - Domains of task slots stored as intervals of start times
+"""
+A task of a given length can start at any time of a sorted list of disjoint
+intervals of start times; its values are the (start, start + length) pairs.
+An Interval_domain stores those intervals instead of one bit per value, so
+its size and the cost of its operations grow with the number of intervals,
+not with the length of the horizon times the number of slots in a day.
+
+Interval_domain supports the operations of Slot_domain that the CSP solvers
+and the propagators use (len, iteration, membership, equality, &, |, -,
+filter, split, bounds, within, without, satisfying, start_intervals and
+starting_in), so the two can be used interchangeably.
+
+Object Class:
+
+Interval_domain -- an immutable set of (start, end) values stored as intervals of starts
+
+Functions:
+
+combine() -- the intervals of the integers in neither, either or both of two interval lists
+"""
+from bisect import bisect_right
+
+class Interval_domain(object):
+    """The (start, start + length) values of every start in intervals, a tuple of
+    sorted, disjoint and non-adjacent (low, high) pairs of integers, high included.
+    Interval_domains are immutable; every operation returns a new domain.
+    """
+    __slots__ = ('intervals', 'length')
+
+    def __init__(self, intervals, length):
+        self.intervals = tuple(intervals)
+        self.length = length
+
+    def with_intervals(self, intervals):
+        """returns the domain of the same length with the given intervals"""
+        return Interval_domain(intervals, self.length)
+
+    def __len__(self):
+        return sum(high - low + 1 for low, high in self.intervals)
+
+    def __bool__(self):
+        return bool(self.intervals)
+
+    def __iter__(self):
+        length = self.length
+        for low, high in self.intervals:
+            for start in range(low, high + 1):
+                yield (start, start + length)
+
+    def __contains__(self, val):
+        start, end = val
+        if end - start != self.length:
+            return False
+        i = bisect_right(self.intervals, (start, float('inf'))) - 1
+        return i >= 0 and self.intervals[i][1] >= start
+
+    def __eq__(self, other):
+        if isinstance(other, Interval_domain):
+            return self.intervals == other.intervals and self.length == other.length
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.intervals)
+
+    def __and__(self, other):
+        return self.with_intervals(combine(self.intervals, other.intervals, lambda a, b: a and b))
+
+    def __or__(self, other):
+        return self.with_intervals(combine(self.intervals, other.intervals, lambda a, b: a or b))
+
+    def __sub__(self, other):
+        return self.with_intervals(combine(self.intervals, other.intervals, lambda a, b: a and not b))
+
+    def is_singleton(self):
+        """is True if exactly one value remains"""
+        return len(self.intervals) == 1 and self.intervals[0][0] == self.intervals[0][1]
+
+    def bounds(self, field=0):
+        """returns the least and the greatest val[field] of the values; the
+        domain must not be empty"""
+        shift = self.length * field
+        return self.intervals[0][0] + shift, self.intervals[-1][1] + shift
+
+    def within(self, field, low=None, high=None):
+        """returns the domain of the values val with low <= val[field] <= high,
+        where a bound of None is unbounded"""
+        shift = self.length * field
+        low = float('-inf') if low is None else low - shift
+        high = float('inf') if high is None else high - shift
+        return self.with_intervals((max(first, low), min(last, high))
+                                   for first, last in self.intervals
+                                   if max(first, low) <= min(last, high))
+
+    def without(self, field, low=None, high=None):
+        """returns the domain of the values val that are not within(field, low, high)"""
+        return self - self.within(field, low, high)
+
+    def start_intervals(self):
+        """returns the sorted disjoint (low, high) intervals of the starts of the values"""
+        return self.intervals
+
+    def starting_in(self, intervals):
+        """returns the domain of the values whose start is in one of intervals,
+        sorted disjoint (low, high) pairs, high included"""
+        return self.with_intervals(combine(self.intervals, tuple(intervals), lambda a, b: a and b))
+
+    def satisfying(self, condition):
+        """returns the domain of the values that satisfy condition; a condition
+        with a bounds attribute (field, low, high) is applied as within()"""
+        bounds = getattr(condition, 'bounds', None)
+        if bounds is not None:
+            return self.within(*bounds)
+        return self.filter(condition)
+
+    def filter(self, condition):
+        """returns the domain of the values that satisfy condition"""
+        intervals = []
+        for start, end in self:
+            if condition((start, end)):
+                if intervals and intervals[-1][1] == start - 1:
+                    intervals[-1][1] = start
+                else:
+                    intervals.append([start, start])
+        return self.with_intervals(tuple(interval) for interval in intervals)
+
+    def split(self, size=None):
+        """partitions the domain into two; the first has the size (by default
+        len//2) lowest values"""
+        size = len(self) // 2 if size is None else size
+        low = []
+        for i, (first, last) in enumerate(self.intervals):
+            if last - first + 1 >= size:
+                if size > 0:
+                    low.append((first, first + size - 1))
+                rest = ((first + size, last),) if first + size <= last else ()
+                return (self.with_intervals(low),
+                        self.with_intervals(rest + self.intervals[i + 1:]))
+            low.append((first, last))
+            size -= last - first + 1
+        return self.with_intervals(low), self.with_intervals(())
+
+    def __repr__(self):
+        return "{" + ", ".join(f"({low}..{high}, +{self.length})" for low, high in self.intervals) + "}"
+
+def combine(intervals_a, intervals_b, keep):
+    """returns the sorted disjoint intervals of the integers x for which
+    keep(x in intervals_a, x in intervals_b) is True; keep(False, False) must be False
+    """
+    cuts = sorted({cut for low, high in intervals_a + intervals_b for cut in (low, high + 1)})
+    result = []
+    i = j = 0
+    for first, after in zip(cuts, cuts[1:]):
+        while i < len(intervals_a) and intervals_a[i][1] < first:
+            i += 1
+        while j < len(intervals_b) and intervals_b[j][1] < first:
+            j += 1
+        in_a = i < len(intervals_a) and intervals_a[i][0] <= first
+        in_b = j < len(intervals_b) and intervals_b[j][0] <= first
+        if keep(in_a, in_b):
+            if result and result[-1][1] == first - 1:
+                result[-1] = (result[-1][0], after - 1)
+            else:
+                result.append((first, after - 1))
+    return tuple(result)
@@ -0,0 +1,94 @@
+# searchBranchAndBound.py - Branch and Bound Search
+# AIFCA Python3 code Version 0.8.1 Documentation at http://aipython.org
+
+# Artificial Intelligence: Foundations of Computational Agents
+# http://artint.info
+# Copyright David L Poole and Alan K Mackworth 2017.
+# This work is licensed under a Creative Commons
+# Attribution-NonCommercial-ShareAlike 4.0 International License.
+# See: http://creativecommons.org/licenses/by-nc-sa/4.0/deed.en
+
+from searchProblem import Path
+from searchGeneric import Searcher
+from display import visualize
+
+class DF_branch_and_bound(Searcher):
+    """returns a branch and bound searcher for a problem.
+    An optimal path with cost less than bound can be found by calling search()
+    """
+    def __init__(self, problem, bound=float("inf"), visited=None, shared_bound=None, budget=None,
+                 history=None):
+        """creates a searcher than can be used with search() to find an optimal path.
+        bound gives the initial bound. By default this is infinite - meaning there
+        is no initial pruning due to depth bound
+        visited is an optional Visited_table of states already expanded
+        shared_bound is an optional multiprocessing.Value holding the best cost
+        found by any of several searchers; this searcher prunes against it and
+        lowers it when it finds a better path
+        budget is an optional Budget; when it runs out the best path so far is returned
+        history is as in Searcher
+        """
+        super().__init__(problem, visited, budget, history)
+        self.best_path = None
+        self.bound = bound
+        self.shared_bound = shared_bound
+        self.optimal = False
+
+    @visualize
+    def search(self):
+        """returns an optimal solution to a problem with cost less than bound.
+        returns None if there is no solution with cost less than bound.
+        The heuristic must never overestimate the cost of the best goal below a
+        node; it may be non-zero at a goal if it is the exact remaining cost
+        there, so the cost of a goal is path.cost + heuristic.
+        When the frontier is exhausted the best path found is optimal; with a
+        shared bound, no path is cheaper than the best one of all the searchers.
+        When the budget runs out first, the best path found so far is returned
+        and optimal is False.
+        """
+        for _ in self.solutions():
+            pass
+        return self.best_path
+
+    def solutions(self):
+        """yields (path, cost, elapsed seconds) for every path found that is
+        cheaper than the ones before, as soon as it is found; search() runs
+        it to the end"""
+        self.frontier = [Path(self.problem.start_node())]
+        self.num_expanded = 0
+        self.optimal = False
+        self.budget.start()
+        while self.frontier:
+            if self.out_of_budget():
+                break
+            path = self.frontier.pop()
+            if self.is_duplicate(path):
+                continue
+            if self.shared_bound is not None and self.shared_bound.value < self.bound:
+                self.bound = self.shared_bound.value
+            value = path.cost+self.problem.heuristic(path.end())
+            if value < self.bound:
+                self.display(3,"Expanding:",path,"cost:",path.cost)
+                self.num_expanded += 1
+                if self.problem.is_goal(path.end()):
+                    self.best_path = path
+                    self.bound = value
+                    self.improved(path, value)
+                    self.display(2,"New best path:",path," cost:",value)
+                    yield path, value, self.budget.elapsed()
+                else:
+                    neighs = self.problem.neighbors(path.end())
+                    self.display(3,"Neighbors are", neighs)
+                    for arc in reversed(list(neighs)):
+                        self.add_to_frontier(self.extend(path, arc))
+        else:
+            self.optimal = True
+        self.display(1,"Number of paths expanded:",self.num_expanded)
+        self.solution = self.best_path
+
+    def improved(self, path, value):
+        """records that path, of cost value, is the new best path"""
+        if self.shared_bound is not None:
+            with self.shared_bound.get_lock():
+                if value < self.shared_bound.value:
+                    self.shared_bound.value = value
@@ -15,10 +15,21 @@ class Searcher(Displayable):
     Paths can be found by repeatedly calling search().
     This does depth-first search unless overridden
     """
-    def __init__(self, problem):
+    def __init__(self, problem, visited=None, budget=None, history=None):
         """creates a searcher from a problem
+        visited is an optional Visited_table; paths ending in a state that
+        is already in it are not expanded again.
+        budget is an optional Budget; when it is exhausted the search stops
+        and exhausted is set.
+        history is whether whole paths are kept (by default problem.history);
+        without history a path is just its end node and its cost, so that the
+        nodes it went through can be freed once they are expanded.
         """
         self.problem = problem
+        self.visited = visited
+        self.budget = budget or Budget()
+        self.history = problem.history if history is None else history
+        self.exhausted = False
         self.initialize_frontier()
         self.num_expanded = 0
         self.add_to_frontier(Path(problem.start_node()))
@@ -37,10 +48,15 @@ class Searcher(Displayable):
     def search(self):
         """returns (next) path from the problem's start node
         to a goal node. 
-        Returns None if no path exists.
+        Returns None if no path exists or the budget ran out first.
         """
+        self.budget.start()
         while not self.empty_frontier():
+            if self.out_of_budget():
+                return None
             path = self.frontier.pop()
+            if self.is_duplicate(path):
+                continue
             self.display(2, "Expanding:",path,"(cost:",path.cost,")")
             self.num_expanded += 1
             if self.problem.is_goal(path.end()):    # solution found
@@ -52,11 +68,102 @@ class Searcher(Displayable):
                 neighs = self.problem.neighbors(path.end())
                 self.display(3,"Neighbors are", neighs)
                 for arc in reversed(list(neighs)):
-                    self.add_to_frontier(Path(path,arc))
+                    self.add_to_frontier(self.extend(path, arc))
                 self.display(3,"Frontier:",self.frontier)
         self.display(1,"No (more) solutions. Total of",
                      self.num_expanded,"paths expanded.")
 
+    def solutions(self):
+        """yields (path, cost, elapsed seconds) for every goal found that costs
+        less than the ones before, as soon as it is found, until the search or
+        its budget is over. A searcher that stops at its first goal yields
+        that goal only; searchers that keep improving override this.
+        """
+        path = self.search()
+        if path is not None:
+            yield path, path.cost + self.problem.heuristic(path.end()), self.budget.elapsed()
+
+    def extend(self, path, arc):
+        """returns path followed by arc, or without history the path of just
+        the end of arc, with the cost of both"""
+        if self.history:
+            return Path(path, arc)
+        return Path(arc.to_node, cost=path.cost + arc.cost)
+
+    def out_of_budget(self):
+        """is True, and sets exhausted, if the budget is exhausted"""
+        if self.budget.exhausted(self.num_expanded):
+            self.display(1, "Budget exhausted after", self.num_expanded, "expansions")
+            self.exhausted = True
+        return self.exhausted
+
+    def is_duplicate(self, path):
+        """is True if the end of path was already reached by an expanded path.
+        Always False when the searcher has no visited table.
+        """
+        if self.visited is None:
+            return False
+        if self.visited.add(self.problem.state_key(path.end())):
+            return False
+        self.display(3, "Pruning duplicate:", path)
+        return True
+
+import time
+from collections import OrderedDict
+
+class Budget(object):
+    """A limit on a search: it is exhausted once seconds have gone by since it
+    was started, or once nodes nodes have been expanded (None is no limit).
+    Starting a budget that is already started does not restart it, so the
+    searches of one solve can share a budget and its deadline.
+    """
+    def __init__(self, seconds=None, nodes=None):
+        self.seconds = seconds
+        self.nodes = nodes
+        self.started = None
+
+    def start(self):
+        if self.started is None:
+            self.started = time.monotonic()
+
+    def elapsed(self):
+        """the seconds since the budget was started"""
+        return 0 if self.started is None else time.monotonic() - self.started
+
+    def exhausted(self, expanded=0):
+        """is True if the time is up or expanded reached the node limit"""
+        return ((self.nodes is not None and expanded >= self.nodes)
+                or (self.seconds is not None and self.elapsed() >= self.seconds))
+
+
+class Visited_table(object):
+    """A bounded set of the state keys of expanded nodes.
+    * max_size is the maximum number of keys kept; when it is exceeded the
+      least recently seen key is evicted (so that state may be expanded again)
+    * pruned is the number of duplicates that were detected
+    * evicted is the number of keys evicted
+    """
+    def __init__(self, max_size=1000000):
+        self.max_size = max_size
+        self.keys = OrderedDict()
+        self.pruned = 0
+        self.evicted = 0
+
+    def add(self, key):
+        """adds key; returns False (and counts a duplicate) if key was already in"""
+        if key in self.keys:
+            self.keys.move_to_end(key)
+            self.pruned += 1
+            return False
+        self.keys[key] = None
+        if len(self.keys) > self.max_size:
+            self.keys.popitem(last=False)
+            self.evicted += 1
+        return True
+
+    def __len__(self):
+        return len(self.keys)
+
 import heapq        # part of the Python standard library
 from searchProblem import Path
 
@@ -113,8 +220,8 @@ class AStarSearcher(Searcher):
     Paths can be found by repeatedly calling search().
     """
 
-    def __init__(self, problem):
-        super().__init__(problem)
+    def __init__(self, problem, visited=None, budget=None, history=None):
+        super().__init__(problem, visited, budget, history)
 
     def initialize_frontier(self):
         self.frontier = FrontierPQ()
@@ -132,8 +239,12 @@ class GreedySearcher(Searcher):
     Paths can be found by repeatedly calling search().
     """
 
-    def __init__(self, problem):
-        super().__init__(problem)
+    def __init__(self, problem, visited=None, budget=None, history=None, bound=float("inf")):
+        """bound is an upper bound: a path whose heuristic value is bound or
+        more is not added to the frontier, so with a heuristic that never
+        overestimates only goals cheaper than bound are found"""
+        self.bound = bound
+        super().__init__(problem, visited, budget, history)
 
     def initialize_frontier(self):
         self.frontier = FrontierPQ()
@@ -144,4 +255,5 @@ class GreedySearcher(Searcher):
     def add_to_frontier(self,path):
         """add path to the frontier with the appropriate cost"""
         value = self.problem.heuristic(path.end())
-        self.frontier.add(path, value)
\ No newline at end of file
+        if value < self.bound:
+            self.frontier.add(path, value)
\ No newline at end of file
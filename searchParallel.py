@@ -0,0 +1,150 @@
+# searchParallel.py - Depth-first branch and bound shared across worker processes
+"""
+Parallel_searcher explores the search tree of a problem (e.g. the domain
+splitting tree of Search_with_AC_from_CSP, whose nodes are the reduced domain
+maps) depth-first in several worker processes.
+
+Every worker keeps its own stack of open nodes. A worker whose stack is empty
+announces that it is idle and waits on a shared work queue; a busy worker that
+sees an idle one gives away the oldest node of its stack, which is the root
+of its largest unexplored subtree. The count of open nodes is shared, so the
+search is over when it reaches 0.
+
+The heuristic must never overestimate and must be exact at a goal, as for
+DF_branch_and_bound. With optimize the workers share the best cost found
+and prune every node that cannot beat it; otherwise the first goal found
+stops all of them.
+
+Object Class:
+
+Parallel_searcher -- a searcher whose search() runs the workers
+
+Functions:
+
+search_worker() -- the loop of one worker process
+"""
+import collections
+import multiprocessing
+import queue
+from searchProblem import Path
+from searchGeneric import Searcher
+
+class Parallel_searcher(Searcher):
+    """returns a parallel depth-first searcher for a problem.
+    * workers is the number of processes (None for one per core)
+    * optimize is True to find an optimal goal, False for any goal
+    * bound is the initial bound of an optimizing search: only goals that
+      cost less are searched for
+    After search(), num_expanded is the total over the workers and optimal is
+    True if the goal found is proven optimal.
+    """
+    def __init__(self, problem, workers=None, optimize=True, budget=None, bound=float('inf')):
+        """budget is an optional Budget; only its time limit applies, as the
+        workers report their expansions when they are done"""
+        super().__init__(problem, budget=budget)
+        self.workers = workers or multiprocessing.cpu_count()
+        self.optimize = optimize
+        self.bound = bound
+        self.optimal = False
+
+    def search(self):
+        """returns a path (of just the goal node) or None if there is no goal"""
+        best = None
+        for best, _, _ in self.solutions():
+            pass
+        return best
+
+    def solutions(self):
+        """yields (path, cost, elapsed seconds) for every goal a worker finds
+        that is better than the ones before, as soon as it is reported"""
+        self.budget.start()
+        work = multiprocessing.Queue()
+        results = multiprocessing.Queue()
+        open_nodes = multiprocessing.Value('l', 1)
+        idle = multiprocessing.Value('l', 0)
+        bound = multiprocessing.Value('d', self.bound)
+        stop = multiprocessing.Event()
+        work.put((self.problem.start_node(), 0))
+        processes = [multiprocessing.Process(target=search_worker, daemon=True,
+                                             args=(self.problem, self.optimize, work, results,
+                                                   open_nodes, idle, bound, stop))
+                     for _ in range(self.workers)]
+        for process in processes:
+            process.start()
+        best = None
+        self.num_expanded = 0
+        self.optimal = False
+        done = 0
+        try:
+            while done < len(processes):
+                if not stop.is_set() and self.out_of_budget():
+                    stop.set()
+                try:
+                    kind, value, node = results.get(timeout=0.1)
+                except queue.Empty:
+                    if not any(process.is_alive() for process in processes):
+                        break
+                    continue
+                if kind == 'goal':
+                    if best is None or value < best[0]:
+                        best = (value, node)
+                        self.display(2, "New best goal, cost:", value)
+                        self.solution = Path(node)
+                        yield self.solution, value, self.budget.elapsed()
+                else:
+                    done += 1
+                    self.num_expanded += value
+        finally:
+            stop.set()
+            for process in processes:
+                if done < len(processes):
+                    process.terminate()     # the caller stopped early; its results are not wanted
+                process.join()
+        self.optimal = self.optimize and open_nodes.value == 0 and not self.exhausted
+        self.display(1, "Number of nodes expanded:", self.num_expanded)
+        self.solution = None if best is None else Path(best[1])
+
+# the loop of one worker process
+def search_worker(problem, optimize, work, results, open_nodes, idle, bound, stop):
+    """expands nodes until stop is set, putting ('goal', cost, node) on results
+    for each goal that is better than the bound, then ('done', expanded, None).
+    """
+    work.cancel_join_thread()   # nodes given away after the end need not be delivered
+    stack = collections.deque()   # (node, path cost) pairs
+    expanded = 0
+    while not stop.is_set():
+        if not stack:
+            with idle.get_lock():
+                idle.value += 1
+            try:
+                stack.append(work.get(timeout=0.05))
+            except queue.Empty:
+                continue
+            finally:
+                with idle.get_lock():
+                    idle.value -= 1
+        node, cost = stack.pop()
+        expanded += 1
+        value = cost + problem.heuristic(node)
+        children = []
+        if optimize and value >= bound.value:
+            pass
+        elif problem.is_goal(node):
+            if optimize:
+                with bound.get_lock():
+                    if value < bound.value:
+                        bound.value = value
+                        results.put(('goal', value, node))
+            else:
+                results.put(('goal', value, node))
+                stop.set()
+        else:
+            children = [(arc.to_node, cost + arc.cost) for arc in problem.neighbors(node)]
+        with open_nodes.get_lock():
+            open_nodes.value += len(children) - 1
+            if open_nodes.value == 0:
+                stop.set()
+        stack.extend(reversed(children))
+        if len(stack) > 1 and idle.value > 0:
+            work.put(stack.popleft())
+    results.put(('done', expanded, None))
@@ -14,7 +14,11 @@ class Search_problem(object):
     * a neighbors function that gives the neighbors of a node
     * a specification of a goal
     * a (optional) heuristic function.
-    The methods must be overridden to define a search problem."""
+    The methods must be overridden to define a search problem.
+    history is whether searchers keep the path to every node; a problem whose
+    solution is only its goal node can set it False, so that a path on the
+    frontier holds its end node and cost, not the chain of nodes before it."""
+    history = True
 
     def start_node(self):
         """returns start node"""
@@ -33,8 +37,15 @@ class Search_problem(object):
         Returns 0 if not overridden."""
         return 0
 
+    def state_key(self,node):
+        """returns a hashable key of node; nodes with equal keys are the same state.
+        Returns node itself if not overridden."""
+        return node
+
 class Arc(object):
     """An arc has a from_node and a to_node node and a (non-negative) cost"""
+    __slots__ = ('from_node', 'to_node', 'action', 'cost')
+
     def __init__(self, from_node, to_node, cost=1, action=None):
         assert cost >= 0, ("Cost cannot be negative for"+
                            str(from_node)+"->"+str(to_node)+", cost: "+str(cost))
@@ -104,14 +115,17 @@ class Search_problem_from_explicit_graph(Search_problem):
 
 class Path(object):
     """A path is either a node or a path followed by an arc"""
-    
-    def __init__(self,initial,arc=None):
+    __slots__ = ('initial', 'arc', 'cost')
+
+    def __init__(self,initial,arc=None,cost=0):
         """initial is either a node (in which case arc is None) or
-        a path (in which case arc is an object of type Arc)"""
+        a path (in which case arc is an object of type Arc).
+        cost is the cost of a path of just a node: 0 for a start node, or the
+        cost of the path to it when that path is not kept"""
         self.initial = initial
         self.arc=arc
         if arc is None:
-            self.cost=0
+            self.cost=cost
         else:
             self.cost = initial.cost+arc.cost
 
@@ -0,0 +1,228 @@
+# searchStats.py - Counters and timers of a search with arc consistency
+"""
+Search_stats counts what a search with arc consistency does and times its
+phases, so that the constraints that dominate a solve can be found:
+
+* arcs_revised, the arcs revised by Con_solver
+* constraint_checks, the calls of Constraint.holds (the revisions that
+  use support tables check the constraint once per pair of values, when
+  the tables are compiled, and are not counted)
+* values_pruned, per constraint (or 'temporal' for the temporal network),
+  the values its revisions or its propagation removed
+* revise_seconds, per constraint, the time spent revising its arcs or
+  propagating it
+* splits, the nodes whose domains were split
+* dead_ends, the propagations that emptied a domain
+* frontier_max, the largest size the frontier of the searcher reached
+* nodes_expanded, the num_expanded of the searcher
+* duplicates_pruned and states_evicted, the pruned and evicted counts of
+  the Visited_table of the searcher (0 without one)
+* seconds, per phase: 'propagation', 'heuristic' and the phases timed with
+  timer(), e.g. 'build' and 'search'
+
+Nothing is counted until instrument() is called: it replaces the methods of
+the given objects (not of their classes) with counting wrappers, and
+uninstrument() puts the plain methods back. solve(), run_searcher() and
+solve_anytime() of fuzzyScheduler uninstrument when their search ends, as
+the Constraints they instrument are those of the caller's Problem. A search
+that is not instrumented runs the plain methods, so leaving the statistics
+off costs nothing per call. Searches in worker processes (Parallel_searcher,
+Component_searcher with workers) are not counted, and Con_solver.index_constraints()
+makes a new temporal network that must be instrumented again.
+
+snapshot() returns the statistics as a dict, to_json() as JSON and
+to_prometheus() in the Prometheus text format.
+
+Object Class:
+
+Search_stats -- the counters and timers of the searches it instruments
+
+Functions:
+
+prometheus_label() -- a label value escaped for the Prometheus text format
+"""
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+class Search_stats(object):
+    """A Search_stats consists of
+    * counts, a name:count Counter of arcs_revised, constraint_checks, splits and dead_ends
+    * pruned, a constraint name:values pruned Counter
+    * constraint_seconds, a constraint name:seconds Counter
+    * seconds, a phase:seconds Counter
+    * frontier_max, the largest frontier size seen
+    * searchers, the searchers instrumented, whose expansions are counted
+    * replaced, the (object, method name, previous instance attribute or None)
+      of every method replaced by a wrapper, for uninstrument()
+    """
+    def __init__(self):
+        self.counts = Counter()
+        self.pruned = Counter()
+        self.constraint_seconds = Counter()
+        self.seconds = Counter()
+        self.frontier_max = 0
+        self.searchers = []
+        self.replaced = []
+
+    @contextmanager
+    def timer(self, phase):
+        """times the body of a with statement as phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[phase] += time.perf_counter() - start
+
+    def instrument(self, problem, searcher=None):
+        """counts the work of problem, a Search_with_AC_from_CSP, and of
+        searcher, a searcher of it, from now on"""
+        cons = problem.cons
+        revise, propagate, heuristic, neighbors = (cons.revise, cons.propagate,
+                                                   problem.heuristic, problem.neighbors)
+        counts, pruned, constraint_seconds, seconds = (self.counts, self.pruned,
+                                                       self.constraint_seconds, self.seconds)
+        clock = time.perf_counter
+
+        def counted_revise(domains, var, const):
+            start = clock()
+            new_domain = revise(domains, var, const)
+            name = repr(const)
+            constraint_seconds[name] += clock() - start
+            counts['arcs_revised'] += 1
+            pruned[name] += len(domains[var]) - len(new_domain)
+            return new_domain
+
+        def counted_propagate(domains, to_do):
+            start = clock()
+            consistent = propagate(domains, to_do)
+            seconds['propagation'] += clock() - start
+            if not consistent:
+                counts['dead_ends'] += 1
+            return consistent
+
+        def counted_heuristic(node):
+            start = clock()
+            value = heuristic(node)
+            seconds['heuristic'] += clock() - start
+            return value
+
+        def counted_neighbors(node):
+            counts['splits'] += 1
+            return neighbors(node)
+
+        self.replace(cons, 'revise', counted_revise)
+        self.replace(cons, 'propagate', counted_propagate)
+        self.replace(problem, 'heuristic', counted_heuristic)
+        self.replace(problem, 'neighbors', counted_neighbors)
+        self.instrument_propagator(cons.temporal, 'temporal')
+        for const in cons.global_constraints:
+            self.instrument_propagator(const.condition, repr(const))
+        for const in cons.csp.constraints:
+            self.instrument_holds(const)
+        if searcher is not None:
+            self.instrument_searcher(searcher)
+
+    def instrument_propagator(self, propagator, name):
+        """counts the values that propagator.propagate(domains, arg) removes,
+        read from the trail of the Domain_store domains, and times it, under name"""
+        propagate = propagator.propagate
+        pruned, constraint_seconds = self.pruned, self.constraint_seconds
+        clock = time.perf_counter
+
+        def counted_propagate(domains, arg):
+            mark = domains.mark()
+            start = clock()
+            changed = propagate(domains, arg)
+            constraint_seconds[name] += clock() - start
+            before = {}
+            for var, dom in domains.trail[mark:]:
+                if var not in before:
+                    before[var] = domains.base[var] if dom is None else dom
+            pruned[name] += sum(len(dom) - len(domains[var]) for var, dom in before.items())
+            return changed
+
+        self.replace(propagator, 'propagate', counted_propagate)
+
+    def instrument_holds(self, const):
+        """counts the checks of Constraint const"""
+        holds = const.holds
+        counts = self.counts
+
+        def counted_holds(assignment):
+            counts['constraint_checks'] += 1
+            return holds(assignment)
+
+        self.replace(const, 'holds', counted_holds)
+
+    def instrument_searcher(self, searcher):
+        """records the largest frontier of searcher and counts its expansions"""
+        add_to_frontier = searcher.add_to_frontier
+
+        def counted_add_to_frontier(path):
+            add_to_frontier(path)
+            size = len(searcher.frontier)
+            if size > self.frontier_max:
+                self.frontier_max = size
+
+        self.replace(searcher, 'add_to_frontier', counted_add_to_frontier)
+        self.searchers.append(searcher)
+
+    def replace(self, obj, name, method):
+        """sets method as the name method of obj, recording what uninstrument() restores"""
+        self.replaced.append((obj, name, vars(obj).get(name)))
+        setattr(obj, name, method)
+
+    def uninstrument(self):
+        """puts back the methods replaced since instrument() was called, so the
+        objects no longer count into these statistics; what was counted is kept"""
+        while self.replaced:
+            obj, name, previous = self.replaced.pop()
+            if previous is None:
+                delattr(obj, name)
+            else:
+                setattr(obj, name, previous)
+
+    def snapshot(self):
+        """returns the statistics as a dict of numbers and of name:number dicts"""
+        stats = {name: self.counts[name] for name in
+                 ('arcs_revised', 'constraint_checks', 'splits', 'dead_ends')}
+        stats['frontier_max'] = self.frontier_max
+        stats['nodes_expanded'] = sum(searcher.num_expanded for searcher in self.searchers)
+        tables = [searcher.visited for searcher in self.searchers
+                  if getattr(searcher, 'visited', None) is not None]
+        stats['duplicates_pruned'] = sum(table.pruned for table in tables)
+        stats['states_evicted'] = sum(table.evicted for table in tables)
+        stats['values_pruned'] = dict(self.pruned.most_common())
+        stats['revise_seconds'] = dict(self.constraint_seconds.most_common())
+        stats['seconds'] = dict(self.seconds)
+        return stats
+
+    def to_json(self, indent=None):
+        """returns the snapshot as a JSON string"""
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix='search_'):
+        """returns the snapshot in the Prometheus text exposition format,
+        every metric name starting with prefix"""
+        stats = self.snapshot()
+        lines = []
+        for name, kind in (('arcs_revised', 'counter'), ('constraint_checks', 'counter'),
+                           ('splits', 'counter'), ('dead_ends', 'counter'),
+                           ('nodes_expanded', 'counter'), ('duplicates_pruned', 'counter'),
+                           ('states_evicted', 'counter'), ('frontier_max', 'gauge')):
+            metric = prefix + name + ('_total' if kind == 'counter' else '')
+            lines.append(f'# TYPE {metric} {kind}')
+            lines.append(f'{metric} {stats[name]}')
+        for name, label in (('values_pruned', 'constraint'), ('revise_seconds', 'constraint'),
+                            ('seconds', 'phase')):
+            metric = prefix + name + '_total'
+            lines.append(f'# TYPE {metric} counter')
+            for key, value in stats[name].items():
+                lines.append(f'{metric}{{{label}="{prometheus_label(key)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+# a label value escaped for the Prometheus text format
+def prometheus_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
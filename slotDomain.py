@@ -0,0 +1,222 @@
+# slotDomain.py - Bitset domains over the possible slots of a task
+"""
+A task's domain is a set of (start, end) values. Instead of storing the values
+themselves, a Slot_domain stores one integer whose bit i is set when value i of
+its Slot_space is still possible. Pruning, intersection, emptiness and
+singleton tests are then bitwise operations, and copying a domain copies a
+single integer.
+
+Object Class:
+
+Slot_space -- the ordered list of values a family of domains ranges over
+Slot_domain -- an immutable set of values of a Slot_space, stored as a bitmask
+
+Functions:
+
+iter_bits() -- enumerates the indexes of the set bits of an integer
+support_tables() -- the compiled supports of a binary condition between two spaces
+
+Static objects:
+
+compiled_supports -- a cache of the support tables built by support_tables()
+"""
+from bisect import bisect_left, bisect_right
+
+compiled_supports = {}
+
+def iter_bits(bits):
+    """enumerates the indexes of the bits set in bits, lowest first"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+class Slot_space(object):
+    """A Slot_space consists of
+    * values, the list of values in increasing order
+    * index, a value:position dictionary
+    * full, the bitmask with every value set
+    Value i of the space is represented by bit i of a Slot_domain.
+    """
+    __slots__ = ('values', 'index', 'full', 'columns')
+
+    def __init__(self, values):
+        self.values = sorted(values)
+        self.index = {val: i for i, val in enumerate(self.values)}
+        self.full = (1 << len(self.values)) - 1
+        self.columns = {}   # field:[val[field] for val in values], built on demand
+
+    def __repr__(self):
+        return "Slot_space(" + str(self.values) + ")"
+
+    def domain(self, values=None):
+        """returns the Slot_domain of values, or the full domain if values is None"""
+        if values is None:
+            return Slot_domain(self.full, self)
+        bits = 0
+        for val in values:
+            bits |= 1 << self.index[val]
+        return Slot_domain(bits, self)
+
+    def mask(self, condition):
+        """returns the bitmask of the values that satisfy condition.
+        A condition with a bounds attribute (field, low, high) is compiled as
+        range_mask(field, low, high) without calling it.
+        """
+        bounds = getattr(condition, 'bounds', None)
+        if bounds is not None:
+            return self.range_mask(*bounds)
+        bits = 0
+        for i, val in enumerate(self.values):
+            if condition(val):
+                bits |= 1 << i
+        return bits
+
+    def range_mask(self, field, low=None, high=None):
+        """returns the bitmask of the values val with low <= val[field] <= high,
+        where a bound of None is unbounded.
+        val[field] must be non-decreasing in the order of values, as the
+        start and the end of the values of a task are.
+        """
+        if field not in self.columns:
+            self.columns[field] = [val[field] for val in self.values]
+        column = self.columns[field]
+        first = 0 if low is None else bisect_left(column, low)
+        last = len(column) if high is None else bisect_right(column, high)
+        if first >= last:
+            return 0
+        return ((1 << last) - 1) ^ ((1 << first) - 1)
+
+class Slot_domain(object):
+    """A set of values of a Slot_space stored as the bitmask bits.
+    Slot_domains are immutable; every operation returns a new domain.
+    They support the set operations the CSP solvers use: len, iteration,
+    membership, equality, &, |, - as well as filter and split, and the range
+    operations the propagators use: bounds, within, without, satisfying,
+    start_intervals and starting_in.
+    """
+    __slots__ = ('bits', 'space')
+
+    def __init__(self, bits, space):
+        self.bits = bits
+        self.space = space
+
+    def with_bits(self, bits):
+        """returns the domain over the same space with the given bits"""
+        return Slot_domain(bits, self.space)
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __iter__(self):
+        values = self.space.values
+        for i in iter_bits(self.bits):
+            yield values[i]
+
+    def __contains__(self, val):
+        i = self.space.index.get(val)
+        return i is not None and (self.bits >> i) & 1 == 1
+
+    def __eq__(self, other):
+        if isinstance(other, Slot_domain):
+            return self.bits == other.bits and self.space is other.space
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def __and__(self, other):
+        return Slot_domain(self.bits & other.bits, self.space)
+
+    def __or__(self, other):
+        return Slot_domain(self.bits | other.bits, self.space)
+
+    def __sub__(self, other):
+        return Slot_domain(self.bits & ~other.bits, self.space)
+
+    def is_singleton(self):
+        """is True if exactly one value remains"""
+        return self.bits != 0 and self.bits & (self.bits - 1) == 0
+
+    def bounds(self, field=0):
+        """returns the least and the greatest val[field] of the values; the
+        domain must not be empty"""
+        bits = self.bits
+        values = self.space.values
+        return values[(bits & -bits).bit_length() - 1][field], values[bits.bit_length() - 1][field]
+
+    def within(self, field, low=None, high=None):
+        """returns the domain of the values val with low <= val[field] <= high,
+        where a bound of None is unbounded"""
+        return Slot_domain(self.bits & self.space.range_mask(field, low, high), self.space)
+
+    def without(self, field, low=None, high=None):
+        """returns the domain of the values that are not within(field, low, high)"""
+        return Slot_domain(self.bits & ~self.space.range_mask(field, low, high), self.space)
+
+    def start_intervals(self):
+        """returns the sorted disjoint (low, high) intervals of the starts of the values"""
+        intervals = []
+        for start, _ in self:
+            if intervals and intervals[-1][1] == start - 1:
+                intervals[-1][1] = start
+            else:
+                intervals.append([start, start])
+        return tuple(tuple(interval) for interval in intervals)
+
+    def starting_in(self, intervals):
+        """returns the domain of the values whose start is in one of intervals,
+        sorted disjoint (low, high) pairs, high included"""
+        mask = 0
+        for low, high in intervals:
+            mask |= self.space.range_mask(0, low, high)
+        return Slot_domain(self.bits & mask, self.space)
+
+    def satisfying(self, condition):
+        """returns the domain of the values that satisfy condition, as one
+        bitmask from Slot_space.mask"""
+        return Slot_domain(self.bits & self.space.mask(condition), self.space)
+
+    def filter(self, condition):
+        """returns the domain of the values that satisfy condition"""
+        values = self.space.values
+        bits = self.bits
+        for i in iter_bits(bits):
+            if not condition(values[i]):
+                bits ^= 1 << i
+        return Slot_domain(bits, self.space)
+
+    def split(self, size=None):
+        """partitions the domain into two; the first has the size (by default
+        len//2) lowest values"""
+        bits = self.bits
+        low = 0
+        for _ in range(self.bits.bit_count() // 2 if size is None else size):
+            bit = bits & -bits
+            low |= bit
+            bits ^= bit
+        return Slot_domain(low, self.space), Slot_domain(bits, self.space)
+
+    def __repr__(self):
+        return "{" + ", ".join(str(val) for val in self) + "}"
+
+def support_tables(condition, space_x, space_y):
+    """returns (x_supports, y_supports) for the binary condition(x, y) where
+    * x_supports[i] is the bitmask of values of space_y that support value i of space_x
+    * y_supports[j] is the bitmask of values of space_x that support value j of space_y
+    Tables are compiled once per (condition, space_x, space_y) and cached.
+    """
+    key = (condition, space_x, space_y)
+    if key not in compiled_supports:
+        x_supports = [0] * len(space_x.values)
+        y_supports = [0] * len(space_y.values)
+        for i, x in enumerate(space_x.values):
+            for j, y in enumerate(space_y.values):
+                if condition(x, y):
+                    x_supports[i] |= 1 << j
+                    y_supports[j] |= 1 << i
+        compiled_supports[key] = (x_supports, y_supports)
+    return compiled_supports[key]